@@ -1,9 +1,13 @@
 import cv2
 from PIL import Image, ImageTk
+from capture_service import acquire_capture, release_capture
+
+CAMERA_INDEX = 3
 
 class CameraModule2:
     def __init__(self):
-        self.cap = None  # Camera capture object
+        self.capture = None  # Shared capture service for the camera
+        self.subscriber = None  # Frames for the Tk preview
         self.running = False  # To track if the camera is running
         self.video_label = None  # Tkinter video label
         self.zoom_factor = 1.0  # Initial zoom factor
@@ -14,19 +18,22 @@ class CameraModule2:
     def start_feed(self, video_label):
         """Start the video feed."""
         if not self.running:
-            self.cap = cv2.VideoCapture(3)  # Open the default camera
-            if not self.cap.isOpened():
+            self.capture = acquire_capture(CAMERA_INDEX)
+            if self.capture is None:
                 print("Error: Unable to access the camera.")
                 return
+            self.subscriber = self.capture.subscribe()
             self.running = True
             self.video_label = video_label
             self._update_frame()
 
     def stop_feed(self):
         """Stop the video feed."""
-        if self.running and self.cap is not None:
+        if self.running and self.capture is not None:
             self.running = False
-            self.cap.release()  # Release the camera
+            self.subscriber.close()
+            release_capture(CAMERA_INDEX)  # Release our hold on the camera
+            self.capture = None
             self.video_label.config(image="")  # Clear the video feed label
 
     def _update_frame(self):
@@ -34,10 +41,10 @@ class CameraModule2:
         if not self.running:
             return
 
-        ret, frame = self.cap.read()
-        if ret:
+        captured = self.subscriber.poll()
+        if captured is not None:
             # Apply zoom by cropping and resizing
-            frame = self._apply_zoom(frame)
+            frame = self._apply_zoom(captured.image)
 
             # Convert frame to a format compatible with Tkinter
             frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -0,0 +1,200 @@
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+# A captured frame together with its sequence number and monotonic capture time
+Frame = namedtuple("Frame", ["seq", "timestamp", "image"])
+
+
+class CaptureService:
+    """
+    Owns a single cv2.VideoCapture and reads it from one grabber thread.
+
+    Only the newest frame is kept. Consumers subscribe and all receive the same
+    frame object, so nobody performs an extra device read. Frames are shared
+    between consumers and must be treated as read-only (copy before drawing).
+
+    While no subscriber is open the device stays open but the grabber stops
+    reading it, so holding a camera (e.g. to know its frame size) is cheap.
+    """
+
+    def __init__(self, camera_index, resolution=None):
+        self.camera_index = camera_index
+        self.resolution = resolution
+        self.cap = None
+        self.running = False
+        self.users = 0  # Number of consumers holding this service
+        self.subscribers = 0  # Open FrameSubscribers; the grabber only reads while there are any
+        self._thread = None
+        self._latest = None
+        self._seq = 0
+        self._new_frame = threading.Condition()
+
+    def start(self):
+        """Open the camera and start the grabber thread."""
+        if self.running:
+            return True
+
+        self.cap = cv2.VideoCapture(self.camera_index)
+        if not self.cap.isOpened():
+            print(f"Error: Unable to access camera {self.camera_index}.")
+            self.cap = None
+            return False
+
+        if self.resolution:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+
+        self.running = True
+        self._thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop the grabber thread and release the camera."""
+        if not self.running:
+            return
+        self.running = False
+        with self._new_frame:
+            self._new_frame.notify_all()  # Wake up any waiting consumers
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self._latest = None
+
+    def _grab_loop(self):
+        while self.running:
+            with self._new_frame:
+                self._new_frame.wait_for(lambda: not self.running or self.subscribers > 0)
+            if not self.running:
+                break
+            ret, image = self.cap.read()
+            timestamp = time.monotonic()
+            if not ret:
+                time.sleep(0.01)  # Avoid spinning on a disconnected camera
+                continue
+
+            with self._new_frame:
+                if not self.subscribers:
+                    continue  # The last subscriber left during the read
+                self._seq += 1
+                self._latest = Frame(self._seq, timestamp, image)
+                self._new_frame.notify_all()
+
+    def frame_size(self):
+        """Return the (width, height) the camera is actually delivering."""
+        if self.cap is None:
+            return None
+        return (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def latest(self):
+        """Return the newest frame without waiting (None before the first frame)."""
+        with self._new_frame:
+            return self._latest
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        """Block until a frame newer than after_seq is available and return it."""
+        with self._new_frame:
+            self._new_frame.wait_for(
+                lambda: not self.running or (self._latest is not None and self._latest.seq > after_seq),
+                timeout=timeout,
+            )
+            if self._latest is not None and self._latest.seq > after_seq:
+                return self._latest
+            return None
+
+    def subscribe(self):
+        """Create a new consumer handle for this camera; close() it when done."""
+        with self._new_frame:
+            self.subscribers += 1
+            self._new_frame.notify_all()  # Resume the grabber
+        return FrameSubscriber(self)
+
+    def _unsubscribe(self):
+        with self._new_frame:
+            self.subscribers -= 1
+            if self.subscribers == 0:
+                self._latest = None  # Paused: a later subscriber must not get this old frame
+
+
+class FrameSubscriber:
+    """
+    A consumer of a CaptureService.
+
+    Each subscriber remembers the last frame it handled, so it only ever sees
+    newer frames. Frames that were overwritten before the consumer got to them
+    are skipped and counted in `dropped`.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.last_seq = 0
+        self.dropped = 0
+        self.closed = False
+
+    def close(self):
+        """Stop receiving frames; the grabber pauses once every subscriber is closed."""
+        if not self.closed:
+            self.closed = True
+            self.service._unsubscribe()
+
+    def _accept(self, frame):
+        if frame is None or frame.seq <= self.last_seq:
+            return None
+        if self.last_seq:
+            self.dropped += frame.seq - self.last_seq - 1
+        self.last_seq = frame.seq
+        return frame
+
+    def poll(self):
+        """Return the newest frame if it has not been seen yet, otherwise None."""
+        return self._accept(self.service.latest())
+
+    def read(self, timeout=1.0):
+        """Wait for a frame newer than the last one seen (None on timeout)."""
+        return self._accept(self.service.wait_for_frame(self.last_seq, timeout))
+
+
+# One capture service per camera device, shared by every consumer in the process
+_services = {}
+_services_lock = threading.Lock()
+
+
+def acquire_capture(camera_index, resolution=None):
+    """
+    Get the shared capture service for a camera, opening it on first use.
+    Every successful call must be paired with release_capture().
+    """
+    with _services_lock:
+        service = _services.get(camera_index)
+        if service is None:
+            service = CaptureService(camera_index, resolution)
+            _services[camera_index] = service
+        elif resolution and service.resolution and tuple(resolution) != tuple(service.resolution):
+            print(f"Warning: Camera {camera_index} already open at {service.resolution}, "
+                  f"ignoring requested {resolution}.")
+
+        if not service.start():
+            if service.users == 0:
+                del _services[camera_index]
+            return None
+        service.users += 1
+        return service
+
+
+def release_capture(camera_index):
+    """Drop one consumer of a camera; the device is closed when nobody uses it."""
+    with _services_lock:
+        service = _services.get(camera_index)
+        if service is None:
+            return
+        service.users -= 1
+        if service.users <= 0:
+            del _services[camera_index]
+            service.stop()
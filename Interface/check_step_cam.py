@@ -1,40 +1,60 @@
 import cv2
 from PIL import Image, ImageTk
-import mediapipe as mp
+from capture_service import acquire_capture, release_capture
+from hand_detection import HandDetector
+
+CAMERA_INDEX = 1
+RUN_HANDS_IN_PROCESS = True  # Run MediaPipe in a worker process instead of a background thread
+MAX_NUM_HANDS = 2  # Detect up to 2 hands
+MIN_DETECTION_CONFIDENCE = 0.5  # Adjust confidence as needed
 
 class CameraModule_checkstep:
     def __init__(self):
-        self.cap = None  # Camera capture object
+        self.capture = None  # Shared capture service for the camera
+        self.preview_subscriber = None  # Frames for the Tk preview
         self.running = False  # To track if the camera is running
-        self.mp_hands = mp.solutions.hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,                # Detect up to 2 hands
-            min_detection_confidence=0.5    # Adjust confidence as needed
-        )
+        self.hand_detector = None  # Runs MediaPipe off the GUI thread
+        self.hand_listeners = []  # Called with every hand result on the detector thread
         self.zoom_factor = 1.0  # Default zoom factor
 
     def start_feed(self, video_label):
         if not self.running:
-            self.cap = cv2.VideoCapture(1)  # Open the default camera
-            if not self.cap.isOpened():
+            self.capture = acquire_capture(CAMERA_INDEX)
+            if self.capture is None:
                 print("Error: Unable to access the camera.")
                 return
+            self.preview_subscriber = self.capture.subscribe()
             self.running = True
+            self._start_hand_detection()
             self._update_frame(video_label)
 
+    def _start_hand_detection(self):
+        self.hand_detector = HandDetector(self.capture, RUN_HANDS_IN_PROCESS, MAX_NUM_HANDS,
+                                          MIN_DETECTION_CONFIDENCE)
+        self.hand_detector.listeners = self.hand_listeners
+        self.hand_detector.start()
+
+    def _stop_hand_detection(self):
+        if self.hand_detector is not None:
+            self.hand_detector.stop()
+            self.hand_detector = None
+
     def stop_feed(self):
-        if self.running and self.cap is not None:
+        if self.running and self.capture is not None:
             self.running = False
-            self.cap.release()  # Release the camera
+            self._stop_hand_detection()
+            self.preview_subscriber.close()
+            release_capture(CAMERA_INDEX)  # Release our hold on the camera
+            self.capture = None
 
     def _update_frame(self, video_label):
         if not self.running:
             return
 
-        ret, frame = self.cap.read()
-        if ret:
+        captured = self.preview_subscriber.poll()
+        if captured is not None:
             # Apply zoom
-            frame = self._apply_zoom(frame)
+            frame = self._apply_zoom(captured.image)
 
             # Resize the frame to a larger resolution (e.g., 640x480)
             frame = cv2.resize(frame, (480, 360))
@@ -84,10 +104,10 @@ class CameraModule_checkstep:
         else:
             print("Invalid zoom factor. It must be greater than 0.")
 
-    def get_current_frame(self):
-        """Retrieve the current frame from the video feed."""
-        if self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if ret:
-                return frame
-        return None
+    def add_hand_listener(self, listener):
+        """Call listener(result) for every hand result, from the detector thread."""
+        self.hand_listeners.append(listener)
+
+    def remove_hand_listener(self, listener):
+        if listener in self.hand_listeners:
+            self.hand_listeners.remove(listener)
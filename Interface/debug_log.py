@@ -0,0 +1,33 @@
+import time
+
+
+class RateLimitedLogger:
+    """
+    Prints debug lines at most once per interval for each key.
+
+    Lines dropped in between are counted and reported with the next line
+    that gets through. Set enabled=False to silence it completely.
+    """
+
+    def __init__(self, interval=1.0, enabled=True):
+        self.interval = interval
+        self.enabled = enabled
+        self._last = {}  # key -> time of the last printed line
+        self._suppressed = {}  # key -> lines dropped since then
+
+    def log(self, key, message, now=None):
+        """Print message unless a line with the same key was printed recently."""
+        if not self.enabled:
+            return False
+        now = time.monotonic() if now is None else now
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            message = f"{message} ({suppressed} similar lines suppressed)"
+        print(message)
+        self._last[key] = now
+        return True
@@ -1,36 +1,60 @@
-from ultralytics import YOLO
 import cv2
-import math
 import time
-from datetime import datetime
+import numpy as np
 import pandas as pd
 from PIL import Image, ImageTk
-
-# Define class names
-classNames = ["backpack", "bench", "handbag", "person", "refrigerator", "product"]
+from capture_service import acquire_capture, release_capture
+from frame_ring import FramePublisher
+from detector_backends import CLASS_NAMES, DETECTOR_BACKEND, detect_two_pass, inference_pixels
+from model_manager import ModelManager
+from motion_gate import MotionGate
+from debug_log import RateLimitedLogger
+from tracker import Tracker
+
+DETECTION_CAMERA_INDEX = 2
+MODEL_WEIGHTS = "models/weights/best.pt"
+DETECTION_CONF = 0.6
+RUN_DETECTION_IN_PROCESS = True  # Run YOLO in a worker process instead of this thread
+DETECTION_STRIDE = 3  # Run YOLO on every Nth frame; the Kalman tracker fills the gaps
+DETECTION_MODE = "two_pass"  # "two_pass": low-res person pass + ROI-crop product pass, "full": one full-frame pass
+PERSON_IMGSZ = 320  # Model input size for the full-frame person pass
+MOTION_GATE = True  # Skip YOLO and reuse the last detections while the scene is static
+MOTION_GATE_OPTIONS = {
+    'frame_threshold': 0.01,  # Fraction of changed pixels in the whole frame
+    'roi_threshold': 0.005,  # Fraction of changed pixels inside the ROI
+    'heartbeat': 2.0,  # Seconds between forced inferences on a static scene
+}
+
+DETECTION_RESOLUTION = (1280, 720)
+DEBUG_DETECTIONS = True  # Print a summary of the detections (at most DEBUG_INTERVAL apart)
+DEBUG_INTERVAL = 1.0
+
+# One detector for the whole application: loaded and warmed up once by
+# preload_detector(), then reused by every detection session
+model_manager = ModelManager(DETECTOR_BACKEND, MODEL_WEIGHTS, DETECTION_CONF, DETECTION_STRIDE,
+                             in_process=RUN_DETECTION_IN_PROCESS, warmup_sizes=(None, PERSON_IMGSZ),
+                             camera_index=DETECTION_CAMERA_INDEX, resolution=DETECTION_RESOLUTION)
+
+# Class ids of the detector (CLASS_NAMES from detector_backends)
+CLASS_NAME_ARRAY = np.array(CLASS_NAMES)  # For looking up names of a whole class-id array at once
+PERSON_CLASS = CLASS_NAMES.index("person")
+PRODUCT_CLASS = CLASS_NAMES.index("product")
 
 # Tracking objects
-tracked_objects = {}
-class_counters = {"person": 1, "product": 1}  # Separate counters for each class
 buffer_time = 1  # Buffer for maintaining stability
 iou_threshold = 0.2  # Minimum IoU for considering as the same object
 distance_threshold = 150  # Euclidean distance threshold
 min_duration = 10  # Minimum duration (in seconds) for logging
 
+# Separate ID counters for each class; any overlap within the distance threshold matches.
+# The motion model predicts boxes on frames where YOLO is skipped.
+tracker = Tracker(buffer_time=buffer_time, distance_threshold=distance_threshold,
+                  min_duration=min_duration, iou_threshold=0.0, per_class_ids=True,
+                  motion_model=True)
+
 # Data logging
-logged_data = []
-
-# Helper function to calculate IoU
-def calculate_iou(boxA, boxB):
-    xA = max(boxA[0], boxB[0])
-    yA = max(boxA[1], boxB[1])
-    xB = min(boxA[2], boxB[2])
-    yB = min(boxA[3], boxB[3])
-    interArea = max(0, xB - xA) * max(0, yB - yA)
-    boxAArea = (boxA[2] - boxA[0]) * (boxA[3] - boxA[1])
-    boxBArea = (boxB[2] - boxB[0]) * (boxB[3] - boxB[1])
-    iou = interArea / float(boxAArea + boxBArea - interArea)
-    return iou
+logged_data = tracker.logged_data
+debug_log = RateLimitedLogger(DEBUG_INTERVAL, enabled=DEBUG_DETECTIONS)
 
 # Helper function to resize the frame
 def resize_frame(frame, target_width, target_height):
@@ -40,145 +64,139 @@ def resize_frame(frame, target_width, target_height):
     new_height = int(h * scaling_factor)
     return cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
 
+# Filter one frame of detections and feed them to the tracker
+def update_tracker(detections, roi, current_time):
+    xyxy = np.asarray(detections[0], dtype=np.int32).reshape(-1, 4)
+    cls = np.asarray(detections[1], dtype=np.int64)
+    roi_x1, roi_y1, roi_x2, roi_y2 = roi
+
+    # Detect "person" everywhere and "product" only inside the ROI
+    is_person = cls == PERSON_CLASS
+    inside_roi = ((xyxy[:, 0] >= roi_x1) & (xyxy[:, 1] >= roi_y1) &
+                  (xyxy[:, 2] <= roi_x2) & (xyxy[:, 3] <= roi_y2))
+    keep = is_person | ((cls == PRODUCT_CLASS) & inside_roi)
+
+    if debug_log.enabled and len(cls):
+        counts = np.bincount(cls, minlength=len(CLASS_NAMES))
+        summary = ", ".join(f"{counts[i]} {name}" for i, name in enumerate(CLASS_NAMES) if counts[i])
+        debug_log.log("detections", f"Detected: {summary}; tracking {int(keep.sum())}")
+
+    # Match detected objects with tracked objects (logs objects that left)
+    return tracker.update(xyxy[keep], CLASS_NAME_ARRAY[cls[keep]].tolist(), now=current_time)
+
+# Start loading the detector in the background (call once at application start)
+def preload_detector():
+    return model_manager.start()
+
 # Main detection function
 def start_detection(roi_coordinates, video_label=None, stop_event=None):
     """Start detection using the YOLO model within the given ROI."""
-    global tracked_objects  # Ensure tracked_objects is accessible across function calls
-
-    cap = cv2.VideoCapture(2)
-    resolution = (1280, 720)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
-
-    actual_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    actual_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    resolution = DETECTION_RESOLUTION
+    if not model_manager.wait_ready():
+        print("Detector is not available.")
+        return
+    capture = acquire_capture(DETECTION_CAMERA_INDEX, resolution)
+    if capture is None:
+        print("Failed to open the detection camera.")
+        return
+    subscriber = capture.subscribe()
+
+    actual_width, actual_height = capture.frame_size()
     print(f"Detection resolution set to: {int(actual_width)}x{int(actual_height)}")
 
     if actual_width != resolution[0] or actual_height != resolution[1]:
         print("Warning: Camera feed size differs from desired resolution.")
-        
-    model = YOLO("models/weights/best.pt")
 
     roi_x1, roi_y1, roi_x2, roi_y2 = roi_coordinates
     print(f"ROI Coordinates: ({roi_x1}, {roi_y1}), ({roi_x2}, {roi_y2})")  # Debugging print
 
+    # Products only count inside the ROI, so only the ROI needs full-detail inference
+    two_pass_roi = roi_coordinates if DETECTION_MODE == "two_pass" else None
+    if two_pass_roi is not None:
+        frame_shape = (actual_height, actual_width)
+        full_pixels = inference_pixels(frame_shape)
+        two_pass_pixels = inference_pixels(frame_shape, two_pass_roi, PERSON_IMGSZ)
+        print(f"Two-pass inference: {two_pass_pixels} input pixels per frame instead of {full_pixels}")
+
+    gate_options = MOTION_GATE_OPTIONS if MOTION_GATE else None
+    gate = gate_stats = None
+
+    detector = model_manager.detector
+    publisher = worker = None
+    if model_manager.worker is not None:
+        # Frames go through shared memory to the warm YOLO process; only boxes come back
+        worker = model_manager.worker
+        worker.configure({
+            'roi': two_pass_roi,
+            'person_class': PERSON_CLASS,
+            'product_class': PRODUCT_CLASS,
+            'person_imgsz': PERSON_IMGSZ,
+            'gate_roi': roi_coordinates,
+            'gate_options': gate_options,
+        })
+        worker.get_latest_result()  # Drop anything left over from the previous session
+        if model_manager.ring.shape[:2] != (actual_height, actual_width):
+            print("Warning: Frames are resized to the detector ring; boxes may be offset.")
+        publisher = FramePublisher(capture, model_manager.ring)
+        publisher.start()
+    elif gate_options is not None:
+        gate = MotionGate(**gate_options)
+    last_detections = None
+
     # Target dimensions for Tkinter display
     target_width = 500
     target_height = 400
 
+    frame_count = 0
     try:
         while not stop_event.is_set():  # Check if the stop signal has been set
-            success, img = cap.read()
-            if not success:
+            # Render every camera frame; detections only arrive every DETECTION_STRIDE frames
+            frame = subscriber.read(timeout=1.0)
+            if frame is None:
                 print("Failed to capture frame from the camera.")
                 break
-
-            results = model(img, stream=True, conf=0.6)
+            img = frame.image.copy()  # The captured frame is shared with other consumers
+            frame_count += 1
+
+            detections = None
+            if worker is not None:
+                result = worker.get_latest_result()
+                if result is not None:
+                    detections = (result['xyxy'], result['cls'])
+                    gate_stats = result['gate']
+                elif not worker.is_alive():
+                    print("Detection worker exited unexpectedly.")
+                    break
+            elif (frame_count - 1) % DETECTION_STRIDE == 0:
+                if gate is not None and not gate.should_run(img, roi_coordinates, frame.timestamp) \
+                        and last_detections is not None:
+                    # Static scene: the previous boxes still hold and keep the tracks alive
+                    detections = last_detections
+                elif two_pass_roi is not None:
+                    detections = detect_two_pass(detector, img, DETECTION_CONF, two_pass_roi, PERSON_CLASS,
+                                                 PRODUCT_CLASS, PERSON_IMGSZ)[:2]
+                else:
+                    detections = detector.predict(img, DETECTION_CONF)[:2]
+                last_detections = detections
 
             # Draw ROI on the frame
             cv2.rectangle(img, (roi_x1, roi_y1), (roi_x2, roi_y2), (0, 255, 0), 2)
 
-            # Process detections
-            detected_objects = []  # Temporary storage for currently detected objects
-            for r in results:
-                boxes = r.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    class_id = int(box.cls[0])
-                    class_name = classNames[class_id]
-
-                    # Debugging print for bounding box and class name
-                    print(f"Detected: {class_name} at ({x1}, {y1}), ({x2}, {y2})")
-
-                    # Detect "person" everywhere
-                    if class_name == "person":
-                        detected_objects.append({'bbox': (x1, y1, x2, y2), 'class_name': class_name})
-
-                    # Detect "product" only inside the ROI
-                    elif class_name == "product":
-                        if x1 >= roi_x1 and y1 >= roi_y1 and x2 <= roi_x2 and y2 <= roi_y2:
-                            detected_objects.append({'bbox': (x1, y1, x2, y2), 'class_name': class_name})
-
-            # Match detected objects with tracked objects
             current_time = time.time()
-            new_tracked_objects = {}
-
-            for detected in detected_objects:
-                bbox = detected['bbox']
-                class_name = detected['class_name']
-
-                # Assign a unique ID to new objects or match with existing ones
-                best_match_id = None
-                best_iou = 0
-                best_distance = float('inf')
-
-                for obj_id, tracked in tracked_objects.items():
-                    if tracked['class_name'] != class_name:
-                        continue  # Only compare objects of the same class
-
-                    tracked_bbox = tracked['bbox']
-                    detected_center = ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
-                    tracked_center = ((tracked_bbox[0] + tracked_bbox[2]) / 2, (tracked_bbox[1] + tracked_bbox[3]) / 2)
-
-                    # Calculate IoU and distance
-                    iou = calculate_iou(bbox, tracked_bbox)
-                    distance = math.sqrt((detected_center[0] - tracked_center[0])**2 +
-                                         (detected_center[1] - tracked_center[1])**2)
-
-                    # Use both IoU and distance for matching
-                    if iou > best_iou and distance < distance_threshold:
-                        best_iou = iou
-                        best_distance = distance
-                        best_match_id = obj_id
-
-                if best_match_id is not None:
-                    # Update existing tracked object
-                    new_tracked_objects[best_match_id] = {
-                        'bbox': bbox,
-                        'start_time': tracked_objects[best_match_id]['start_time'],
-                        'last_seen': current_time,
-                        'class_name': class_name
-                    }
-                else:
-                    # Create a new tracked object with a class-specific ID
-                    object_id = class_counters[class_name]
-                    class_counters[class_name] += 1  # Increment the counter for this class
-
-                    new_tracked_objects[object_id] = {
-                        'bbox': bbox,
-                        'start_time': current_time,
-                        'last_seen': current_time,
-                        'class_name': class_name
-                    }
-
-            # Retain objects within the buffer time
-            for obj_id, tracked in tracked_objects.items():
-                if obj_id not in new_tracked_objects:
-                    if current_time - tracked['last_seen'] <= buffer_time:
-                        new_tracked_objects[obj_id] = tracked
-                    else:
-                        # Object left the ROI; log data if duration exceeds minimum
-                        elapsed_time = tracked['last_seen'] - tracked['start_time']
-                        if elapsed_time >= min_duration:
-                            logged_data.append({
-                                'ID': obj_id,
-                                'Class': tracked['class_name'],
-                                'Start Time': datetime.fromtimestamp(tracked['start_time']).strftime('%I:%M:%S %p'),
-                                'End Time': datetime.fromtimestamp(tracked['last_seen']).strftime('%I:%M:%S %p'),
-                                'Total Duration (s)': round(elapsed_time, 2)
-                            })
-
-            # Update tracked objects
-            tracked_objects = new_tracked_objects
+            if detections is None:
+                # No inference on this frame: move the tracks with their motion model
+                tracked_objects = tracker.predict(current_time)
+            else:
+                tracked_objects = update_tracker(detections, (roi_x1, roi_y1, roi_x2, roi_y2), current_time)
 
             # Draw bounding boxes and labels
-            for obj_id, tracked in tracked_objects.items():
+            for tracked in tracked_objects.values():
                 bbox = tracked['bbox']
                 elapsed_time = current_time - tracked['start_time']
 
                 # Draw bounding box and label
                 cv2.rectangle(img, (bbox[0], bbox[1]), (bbox[2], bbox[3]), (255, 0, 255), 3)
-                cv2.putText(img, f"{tracked['class_name']} {obj_id}: {elapsed_time:.2f}s",
+                cv2.putText(img, f"{tracked['class_name']} {tracked['id']}: {elapsed_time:.2f}s",
                             (bbox[0], bbox[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
 
             # Resize the frame for GUI (if using Tkinter)
@@ -196,7 +214,15 @@ def start_detection(roi_coordinates, video_label=None, stop_event=None):
                     break
 
     finally:
-        cap.release()
+        if publisher is not None:
+            publisher.stop()  # The worker and the model stay loaded for the next session
+        subscriber.close()
+        release_capture(DETECTION_CAMERA_INDEX)
+        if gate is not None:
+            gate_stats = gate.stats()
+        if gate_stats:
+            print(f"Motion gate: skipped {gate_stats['gated']} of {gate_stats['frames']} inferences "
+                  f"({gate_stats['gated_ratio']:.0%}), {gate_stats['heartbeat']} heartbeat runs")
         print("Detection stopped.")
 
     # Save logged data to a CSV
@@ -0,0 +1,398 @@
+import os
+import time
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+# Which inference backend to use: torch, onnx, onnx-int8, openvino or openvino-int8.
+# Exported models are created with export_model.py next to the .pt weights.
+DETECTOR_BACKEND = os.environ.get("DETECTOR_BACKEND", "torch")
+DEFAULT_WEIGHTS = "models/weights/best.pt"
+DEFAULT_IMGSZ = 640
+CLASS_NAMES = ["backpack", "bench", "handbag", "person", "refrigerator", "product"]  # Class ids of the weights
+NMS_IOU = 0.45
+STRIDE = 32  # Input sizes must be multiples of the model stride
+TILE_SIZE = 640  # Tiled inference: tile edge in frame pixels (run at native resolution)
+TILE_OVERLAP = 0.2  # Fraction of a tile shared with its neighbour
+TILE_MERGE_IOS = 0.6  # Intersection over the smaller box above which a tile-edge fragment is dropped
+
+
+def exported_model_path(weights, backend):
+    """Return where export_model.py writes the model for a backend."""
+    stem, _ = os.path.splitext(weights)
+    name = os.path.basename(stem)
+    paths = {
+        "onnx": f"{stem}.onnx",
+        "onnx-int8": f"{stem}_int8.onnx",
+        "openvino": os.path.join(f"{stem}_openvino_model", f"{name}.xml"),
+        "openvino-int8": os.path.join(f"{stem}_int8_openvino_model", f"{name}.xml"),
+    }
+    return paths.get(backend, weights)
+
+
+def stride_size(size, stride=STRIDE):
+    """Round a size up to a multiple of the model stride."""
+    return int(np.ceil(size / stride) * stride)
+
+
+def letterbox(image, imgsz=DEFAULT_IMGSZ, rect=False):
+    """
+    Resize an image to fit imgsz keeping its aspect ratio and pad the rest
+    with grey, like ultralytics does. The result is imgsz x imgsz, or with
+    rect=True only padded up to the next stride multiple (for dynamic models).
+    Returns the padded image, the scale and the (left, top) padding so boxes
+    can be mapped back.
+    """
+    h, w = image.shape[:2]
+    scale = min(imgsz / w, imgsz / h)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    out_w, out_h = (stride_size(new_w), stride_size(new_h)) if rect else (imgsz, imgsz)
+    left, top = (out_w - new_w) // 2, (out_h - new_h) // 2
+
+    padded = np.full((out_h, out_w, 3), 114, dtype=np.uint8)
+    padded[top:top + new_h, left:left + new_w] = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return padded, scale, (left, top)
+
+
+def preprocess(images, imgsz=DEFAULT_IMGSZ, rect=False):
+    """
+    Letterbox a list of BGR images into one NCHW float32 RGB batch.
+    With rect=True all images must have the same size.
+    """
+    batch = None
+    transforms = []
+    for i, image in enumerate(images):
+        padded, scale, pad = letterbox(image, imgsz, rect)
+        if batch is None:
+            batch = np.empty((len(images), 3) + padded.shape[:2], dtype=np.float32)
+        batch[i] = padded[:, :, ::-1].transpose(2, 0, 1)
+        transforms.append((scale, pad, image.shape[:2]))
+    batch *= 1.0 / 255.0
+    return batch, transforms
+
+
+def postprocess(output, transform, conf, classes=None, iou=NMS_IOU):
+    """
+    Decode one raw YOLOv8 output of shape (4 + num_classes, anchors) into
+    (xyxy, cls, conf) arrays in original image coordinates.
+    """
+    predictions = output.T  # (anchors, 4 + num_classes)
+    class_scores = predictions[:, 4:]
+    cls = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(cls)), cls]
+
+    keep = scores >= conf
+    if classes is not None:
+        keep &= np.isin(cls, classes)
+    predictions, cls, scores = predictions[keep], cls[keep], scores[keep]
+    if len(scores) == 0:
+        return empty_detections()
+
+    # Centre/size boxes to corners, then undo the letterbox
+    scale, (left, top), (h, w) = transform
+    boxes = np.empty((len(scores), 4), dtype=np.float32)
+    boxes[:, 0] = predictions[:, 0] - predictions[:, 2] / 2
+    boxes[:, 1] = predictions[:, 1] - predictions[:, 3] / 2
+    boxes[:, 2] = predictions[:, 0] + predictions[:, 2] / 2
+    boxes[:, 3] = predictions[:, 1] + predictions[:, 3] / 2
+    boxes -= (left, top, left, top)
+    boxes /= scale
+    np.clip(boxes, 0, (w, h, w, h), out=boxes)
+
+    keep = nms(boxes, scores, cls, iou)
+    return boxes[keep].astype(np.int32), cls[keep].astype(np.int32), scores[keep].astype(np.float32)
+
+
+def nms(boxes, scores, cls, iou=NMS_IOU):
+    """Class-aware non-maximum suppression; returns indices of the kept boxes."""
+    if len(scores) == 0:
+        return np.empty((0,), dtype=np.int64)
+    # Offset boxes per class so boxes of different classes never overlap
+    offset = boxes + (cls * (boxes.max() + 1))[:, None]
+    xywh = np.column_stack((offset[:, 0], offset[:, 1], offset[:, 2] - offset[:, 0], offset[:, 3] - offset[:, 1]))
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), 0.0, iou)
+    return np.asarray(keep, dtype=np.int64).reshape(-1)
+
+
+def empty_detections():
+    return (np.empty((0, 4), dtype=np.int32),
+            np.empty((0,), dtype=np.int32),
+            np.empty((0,), dtype=np.float32))
+
+
+class DetectorBackend(ABC):
+    """
+    Common interface of all detector backends.
+
+    predict() and predict_batch() return (xyxy, cls, conf) NumPy arrays per
+    image: int32 boxes in frame coordinates, int32 class ids and float32
+    confidences, whatever runtime is used underneath. Backends implement
+    predict_batch().
+
+    imgsz can be changed per call when the model has dynamic input shapes
+    (PyTorch, or models exported with dynamic=True); static models always
+    run at their exported size.
+    """
+
+    name = None
+    dynamic = True
+
+    def __init__(self, model_path, imgsz=DEFAULT_IMGSZ):
+        self.model_path = model_path
+        self.imgsz = imgsz
+
+    def predict(self, image, conf, classes=None, imgsz=None):
+        return self.predict_batch([image], conf, classes, imgsz)[0]
+
+    @abstractmethod
+    def predict_batch(self, images, conf, classes=None, imgsz=None):
+        """(xyxy, cls, conf) for each image."""
+
+    def _input_size(self, imgsz):
+        return imgsz if (imgsz and self.dynamic) else self.imgsz
+
+
+class TorchBackend(DetectorBackend):
+    """The original ultralytics/PyTorch model."""
+
+    name = "torch"
+
+    def __init__(self, model_path, imgsz=DEFAULT_IMGSZ):
+        from ultralytics import YOLO
+
+        super().__init__(model_path, imgsz)
+        self.model = YOLO(model_path)
+
+    def predict_batch(self, images, conf, classes=None, imgsz=None):
+        results = self.model(list(images), conf=conf, classes=classes, imgsz=self._input_size(imgsz),
+                             verbose=False)
+        detections = []
+        for r in results:
+            boxes = r.boxes
+            detections.append((boxes.xyxy.cpu().numpy().astype(np.int32),
+                               boxes.cls.cpu().numpy().astype(np.int32),
+                               boxes.conf.cpu().numpy().astype(np.float32)))
+        return detections
+
+
+class OnnxBackend(DetectorBackend):
+    """ONNX Runtime on the CPU (FP32 or INT8 QDQ model)."""
+
+    name = "onnx"
+
+    def __init__(self, model_path, imgsz=DEFAULT_IMGSZ):
+        import onnxruntime as ort
+
+        super().__init__(model_path, imgsz)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.dynamic = not all(isinstance(d, int) for d in model_input.shape[2:])
+        if not self.dynamic:
+            self.imgsz = model_input.shape[2]
+
+    def predict_batch(self, images, conf, classes=None, imgsz=None):
+        batch, transforms = preprocess(images, self._input_size(imgsz), rect=self.dynamic)
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+        return [postprocess(output, transform, conf, classes) for output, transform in zip(outputs, transforms)]
+
+
+class OpenVinoBackend(DetectorBackend):
+    """OpenVINO IR on the CPU (FP32 or INT8)."""
+
+    name = "openvino"
+
+    def __init__(self, model_path, imgsz=DEFAULT_IMGSZ):
+        import openvino as ov
+
+        super().__init__(model_path, imgsz)
+        core = ov.Core()
+        model = core.read_model(model_path)
+        input_shape = model.input(0).get_partial_shape()
+        self.dynamic = input_shape[2].is_dynamic or input_shape[3].is_dynamic
+        if not self.dynamic:
+            self.imgsz = input_shape[2].get_length()
+        self.compiled = core.compile_model(model, "CPU", {"PERFORMANCE_HINT": "LATENCY"})
+        self.output = self.compiled.output(0)
+
+    def predict_batch(self, images, conf, classes=None, imgsz=None):
+        batch, transforms = preprocess(images, self._input_size(imgsz), rect=self.dynamic)
+        outputs = self.compiled(batch)[self.output]
+        return [postprocess(output, transform, conf, classes) for output, transform in zip(outputs, transforms)]
+
+
+def clamp_roi(roi, frame_shape):
+    """Clip (x1, y1, x2, y2) to the frame and return it as ints."""
+    h, w = frame_shape[:2]
+    x1, y1, x2, y2 = (int(v) for v in roi)
+    return max(0, min(x1, w)), max(0, min(y1, h)), max(0, min(x2, w)), max(0, min(y2, h))
+
+
+def roi_imgsz(roi, frame_shape, imgsz=DEFAULT_IMGSZ, product_scale=None):
+    """
+    Model input size for the ROI crop. By default the crop is scaled like a
+    full-frame pass would scale it, so products are seen at the same size as
+    before; product_scale=1.0 runs the crop at native resolution.
+    """
+    x1, y1, x2, y2 = clamp_roi(roi, frame_shape)
+    if product_scale is None:
+        product_scale = imgsz / max(frame_shape[:2])
+    return min(stride_size(max(x2 - x1, y2 - y1) * product_scale), imgsz)
+
+
+def detect_two_pass(detector, image, conf, roi, person_class, product_class, person_imgsz=320,
+                    product_scale=None):
+    """
+    Two cheap passes instead of one full-frame pass:
+      1. the whole frame at low resolution, keeping only person boxes
+      2. only the ROI crop, keeping only products
+    Product boxes are shifted back to frame coordinates. Returns the same
+    (xyxy, cls, conf) arrays as detector.predict().
+    """
+    people = detector.predict(image, conf, classes=[person_class], imgsz=person_imgsz)
+
+    x1, y1, x2, y2 = clamp_roi(roi, image.shape)
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return people
+    crop = image[y1:y2, x1:x2]
+    crop_imgsz = roi_imgsz(roi, image.shape, detector.imgsz, product_scale)
+    boxes, cls, scores = detector.predict(crop, conf, classes=[product_class], imgsz=crop_imgsz)
+    boxes = boxes + np.array([x1, y1, x1, y1], dtype=np.int32)
+
+    return concat_detections([people, (boxes, cls, scores)])
+
+
+def concat_detections(detections):
+    """Join several (xyxy, cls, conf) results into one."""
+    if not detections:
+        return empty_detections()
+    return tuple(np.concatenate(parts) for parts in zip(*detections))
+
+
+def tile_grid(roi, frame_shape, tile_size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """
+    Cover the ROI with overlapping tile_size x tile_size windows, spread
+    evenly so neighbours overlap by at least `overlap`. Every tile has the
+    same size so they can go into one batch. Returns a list of (x1, y1, x2, y2).
+    """
+    x1, y1, x2, y2 = clamp_roi(roi, frame_shape)
+    step = max(tile_size * (1 - overlap), 1)
+
+    def starts(low, high):
+        if high - low <= tile_size:
+            return [low], high - low
+        count = int(np.ceil((high - low - tile_size) / step)) + 1
+        return np.linspace(low, high - tile_size, count).round().astype(int).tolist(), tile_size
+
+    xs, tile_w = starts(x1, x2)
+    ys, tile_h = starts(y1, y2)
+    if tile_w < 2 or tile_h < 2:
+        return []
+    return [(x, y, x + tile_w, y + tile_h) for y in ys for x in xs]
+
+
+def merge_fragments(boxes, scores, cls, threshold=TILE_MERGE_IOS):
+    """
+    Drop boxes that lie mostly inside a higher-scoring box of the same class.
+    An object cut by a tile edge gives a partial box whose IoU with the full
+    box is low, so plain NMS keeps both; intersection over the smaller box
+    catches it. Returns indices of the kept boxes.
+    """
+    order = np.argsort(-scores)
+    b = boxes[order].astype(np.float32)
+    inter_w = np.clip(np.minimum(b[:, None, 2], b[None, :, 2]) - np.maximum(b[:, None, 0], b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(b[:, None, 3], b[None, :, 3]) - np.maximum(b[:, None, 1], b[None, :, 1]), 0, None)
+    area = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    smaller = np.maximum(np.minimum(area[:, None], area[None, :]), 1.0)
+    overlaps = (inter_w * inter_h / smaller > threshold) & (cls[order][:, None] == cls[order][None, :])
+
+    kept = []
+    for i in range(len(order)):
+        if not overlaps[i, kept].any():
+            kept.append(i)
+    return order[kept]
+
+
+def detect_tiled(detector, image, conf, roi, classes=None, tile_size=TILE_SIZE, overlap=TILE_OVERLAP,
+                 iou=NMS_IOU):
+    """
+    Run the detector on overlapping native-resolution tiles of the ROI as one
+    batch, so small objects are not shrunk by letterboxing the whole frame.
+    Tile results are shifted to frame coordinates and merged with cross-tile
+    NMS. Returns the same (xyxy, cls, conf) arrays as detector.predict().
+    """
+    tiles = tile_grid(roi, image.shape, tile_size, overlap)
+    if not tiles:
+        return empty_detections()
+    crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+    tile_w, tile_h = tiles[0][2] - tiles[0][0], tiles[0][3] - tiles[0][1]
+    results = detector.predict_batch(crops, conf, classes, imgsz=stride_size(max(tile_w, tile_h)))
+
+    shifted = [(boxes + np.array([x1, y1, x1, y1], dtype=np.int32), cls, scores)
+               for (x1, y1, _, _), (boxes, cls, scores) in zip(tiles, results)]
+    boxes, cls, scores = concat_detections(shifted)
+    if len(scores) == 0:
+        return empty_detections()
+    keep = nms(boxes.astype(np.float32), scores, cls, iou)
+    keep = keep[merge_fragments(boxes[keep], scores[keep], cls[keep])]
+    return boxes[keep], cls[keep], scores[keep]
+
+
+def inference_pixels(frame_shape, roi=None, person_imgsz=320, imgsz=DEFAULT_IMGSZ, product_scale=None):
+    """
+    Model input pixels per frame for a single full-frame pass (roi=None) or
+    for detect_two_pass(), assuming rect letterboxing.
+    """
+    def pixels(h, w, size):
+        scale = min(size / w, size / h)
+        return stride_size(w * scale) * stride_size(h * scale)
+
+    h, w = frame_shape[:2]
+    if roi is None:
+        return pixels(h, w, imgsz)
+    x1, y1, x2, y2 = clamp_roi(roi, frame_shape)
+    crop_imgsz = roi_imgsz(roi, frame_shape, imgsz, product_scale)
+    return pixels(h, w, person_imgsz) + pixels(y2 - y1, x2 - x1, crop_imgsz)
+
+
+BACKENDS = {
+    "torch": TorchBackend,
+    "onnx": OnnxBackend,
+    "onnx-int8": OnnxBackend,
+    "openvino": OpenVinoBackend,
+    "openvino-int8": OpenVinoBackend,
+}
+
+
+def load_backend(name=None, weights=DEFAULT_WEIGHTS, imgsz=DEFAULT_IMGSZ):
+    """
+    Create the detector for a backend name (defaults to DETECTOR_BACKEND).
+    Falls back to the PyTorch model if the exported model is missing.
+    """
+    name = name or DETECTOR_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{name}', expected one of {sorted(BACKENDS)}")
+
+    model_path = exported_model_path(weights, name)
+    if name != "torch" and not os.path.exists(model_path):
+        print(f"Warning: {model_path} not found (run export_model.py). Falling back to PyTorch.")
+        name, model_path = "torch", weights
+
+    print(f"Loading detector backend '{name}' from {model_path}")
+    return BACKENDS[name](model_path, imgsz)
+
+
+def warm_up(detector, frame_shape=(720, 1280, 3), imgsizes=(None,), runs=2):
+    """
+    Run the detector on a blank frame at every input size it will see, so the
+    first real frame does not pay for lazy initialisation. Returns the seconds taken.
+    """
+    start = time.perf_counter()
+    blank = np.zeros(frame_shape, dtype=np.uint8)
+    for imgsz in imgsizes:
+        for _ in range(runs):
+            detector.predict(blank, 0.5, imgsz=imgsz)
+    return time.perf_counter() - start
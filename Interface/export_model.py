@@ -0,0 +1,302 @@
+"""
+Export the YOLO weights to ONNX and OpenVINO IR for fast CPU inference.
+
+Examples (run from the Interface folder):
+    python export_model.py --formats onnx openvino
+    python export_model.py --formats onnx openvino --int8 --calib-dir calib_frames
+    python export_model.py --save-frames 200 --calib-dir calib_frames
+    python export_model.py --benchmark torch onnx openvino-int8 --calib-dir calib_frames
+    python export_model.py --tile-benchmark --frames-dir dataset/images --roi 400 200 1500 900
+"""
+import argparse
+import glob
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+from detector_backends import (CLASS_NAMES, DEFAULT_IMGSZ, DEFAULT_WEIGHTS, TILE_OVERLAP, TILE_SIZE, clamp_roi,
+                               detect_tiled, exported_model_path, load_backend, preprocess)
+from tracker import iou_matrix
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+PRODUCT_CLASS = CLASS_NAMES.index("product")
+
+
+def image_paths(folder, limit=None):
+    """Image files in a folder, sorted by name."""
+    paths = sorted(p for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(folder, pattern)))
+    return paths[:limit] if limit else paths
+
+
+def load_frames(folder, limit=None):
+    """Load saved BGR frames from a folder (sorted by name)."""
+    frames = [cv2.imread(p) for p in image_paths(folder, limit)]
+    return [f for f in frames if f is not None]
+
+
+def load_labels(image_path, frame_shape):
+    """
+    Read the YOLO-format label file of an image (class cx cy w h, normalised).
+    Looks in the ultralytics images/ -> labels/ layout first, then next to the
+    image. Returns (xyxy, cls) in pixels, or None if there is no label file.
+    """
+    stem = os.path.splitext(image_path)[0]
+    parts = stem.split(os.sep)
+    candidates = [stem + ".txt"]
+    if "images" in parts:
+        index = len(parts) - 1 - parts[::-1].index("images")
+        candidates.insert(0, os.sep.join(parts[:index] + ["labels"] + parts[index + 1:]) + ".txt")
+    for path in candidates:
+        if os.path.exists(path):
+            rows = np.loadtxt(path, ndmin=2)
+            break
+    else:
+        return None
+    if rows.size == 0:
+        return np.empty((0, 4), dtype=np.float32), np.empty((0,), dtype=np.int32)
+
+    h, w = frame_shape[:2]
+    cx, cy, bw, bh = rows[:, 1] * w, rows[:, 2] * h, rows[:, 3] * w, rows[:, 4] * h
+    xyxy = np.column_stack((cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2)).astype(np.float32)
+    return xyxy, rows[:, 0].astype(np.int32)
+
+
+def save_calibration_frames(folder, count, camera_index=2, resolution=(1280, 720), interval=0.5):
+    """Grab frames from the station camera so INT8 calibration sees real scenes."""
+    from capture_service import acquire_capture, release_capture
+
+    os.makedirs(folder, exist_ok=True)
+    capture = acquire_capture(camera_index, resolution)
+    if capture is None:
+        print("Error: Could not open camera.")
+        return
+    subscriber = capture.subscribe()
+    saved = 0
+    try:
+        while saved < count:
+            frame = subscriber.read(timeout=2.0)
+            if frame is None:
+                print("Error: Could not read from the camera.")
+                break
+            cv2.imwrite(os.path.join(folder, f"frame_{saved:05d}.jpg"), frame.image)
+            saved += 1
+            time.sleep(interval)
+    finally:
+        subscriber.close()
+        release_capture(camera_index)
+    print(f"Saved {saved} calibration frames to {folder}")
+
+
+def export_onnx(weights, imgsz):
+    from ultralytics import YOLO
+
+    path = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    print(f"ONNX model written to {path}")
+    return path
+
+
+def export_openvino(weights, imgsz):
+    from ultralytics import YOLO
+
+    path = YOLO(weights).export(format="openvino", imgsz=imgsz, dynamic=True)
+    print(f"OpenVINO model written to {path}")
+    return path
+
+
+def quantize_onnx(weights, frames, imgsz):
+    """Post-training static INT8 quantization with ONNX Runtime."""
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            if frame is None:
+                return None
+            return {self.input_name: preprocess([frame], imgsz)[0]}
+
+    fp32_path = exported_model_path(weights, "onnx")
+    int8_path = exported_model_path(weights, "onnx-int8")
+    input_name = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    quantize_static(
+        fp32_path,
+        int8_path,
+        FrameReader(input_name),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    print(f"INT8 ONNX model written to {int8_path}")
+    return int8_path
+
+
+def quantize_openvino(weights, frames, imgsz):
+    """Post-training INT8 quantization of the OpenVINO IR with NNCF."""
+    import nncf
+    import openvino as ov
+
+    fp32_path = exported_model_path(weights, "openvino")
+    int8_path = exported_model_path(weights, "openvino-int8")
+    model = ov.Core().read_model(fp32_path)
+    dataset = nncf.Dataset(frames, lambda frame: preprocess([frame], imgsz)[0])
+    quantized = nncf.quantize(model, dataset, preset=nncf.QuantizationPreset.MIXED, subset_size=len(frames))
+
+    os.makedirs(os.path.dirname(int8_path), exist_ok=True)
+    ov.save_model(quantized, int8_path)
+    # Keep the metadata ultralytics writes next to the FP32 model
+    metadata = os.path.join(os.path.dirname(fp32_path), "metadata.yaml")
+    if os.path.exists(metadata):
+        shutil.copy(metadata, os.path.dirname(int8_path))
+    print(f"INT8 OpenVINO model written to {int8_path}")
+    return int8_path
+
+
+def benchmark(backends, weights, frames, imgsz, conf=0.6, runs=50):
+    """Print throughput of each backend on the same frames."""
+    if not frames:
+        frames = [np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8)]
+    baseline = None
+    for name in backends:
+        detector = load_backend(name, weights, imgsz)
+        detector.predict(frames[0], conf)  # Warm up
+        start = time.perf_counter()
+        for i in range(runs):
+            detector.predict(frames[i % len(frames)], conf)
+        fps = runs / (time.perf_counter() - start)
+        baseline = baseline or fps
+        print(f"{name:>14}: {fps:6.1f} FPS  ({fps / baseline:.2f}x vs {backends[0]})")
+
+
+def count_matches(pred_boxes, pred_cls, gt_boxes, gt_cls, iou=0.5):
+    """Number of ground-truth boxes found by a prediction of the same class (IoU >= iou)."""
+    if not len(gt_boxes) or not len(pred_boxes):
+        return 0
+    overlap = iou_matrix(np.asarray(gt_boxes, dtype=np.float32), np.asarray(pred_boxes, dtype=np.float32))
+    overlap[gt_cls[:, None] != pred_cls[None, :]] = 0
+    matched, used = 0, set()
+    for g in np.argsort(-overlap.max(axis=1)):
+        for p in np.argsort(-overlap[g]):
+            if overlap[g, p] < iou:
+                break
+            if p not in used:
+                used.add(p)
+                matched += 1
+                break
+    return matched
+
+
+def benchmark_tiled(backend, weights, folder, roi, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, conf=0.6,
+                    classes=(PRODUCT_CLASS,), limit=None):
+    """
+    Compare single-pass and tiled inference on saved frames: latency per
+    frame and, where YOLO label files exist, recall of the labelled objects
+    of the given classes whose centre lies in the ROI.
+    """
+    detector = load_backend(backend, weights)
+    classes = list(classes)
+    modes = {
+        "single-pass": lambda img: detector.predict(img, conf, classes),
+        f"tiled {tile_size}/{overlap:.0%}": lambda img: detect_tiled(detector, img, conf, roi, classes,
+                                                                     tile_size, overlap),
+    }
+    stats = {name: {'time': 0.0, 'found': 0, 'detections': 0} for name in modes}
+    frames = labelled = total_gt = 0
+
+    for path in image_paths(folder, limit):
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        if frames == 0:
+            for run in modes.values():
+                run(img)  # Warm up
+        frames += 1
+        x1, y1, x2, y2 = clamp_roi(roi, img.shape)
+
+        labels = load_labels(path, img.shape)
+        if labels is not None:
+            gt_boxes, gt_cls = labels
+            centers = (gt_boxes[:, :2] + gt_boxes[:, 2:]) / 2
+            wanted = (np.isin(gt_cls, classes) & (centers[:, 0] >= x1) & (centers[:, 0] <= x2) &
+                      (centers[:, 1] >= y1) & (centers[:, 1] <= y2))
+            gt_boxes, gt_cls = gt_boxes[wanted], gt_cls[wanted]
+            labelled += 1
+            total_gt += len(gt_cls)
+
+        for name, run in modes.items():
+            start = time.perf_counter()
+            boxes, cls, _ = run(img)
+            stats[name]['time'] += time.perf_counter() - start
+            centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+            in_roi = (centers[:, 0] >= x1) & (centers[:, 0] <= x2) & (centers[:, 1] >= y1) & (centers[:, 1] <= y2)
+            boxes, cls = boxes[in_roi], cls[in_roi]
+            stats[name]['detections'] += len(cls)
+            if labels is not None:
+                stats[name]['found'] += count_matches(boxes, cls, gt_boxes, gt_cls)
+
+    if not frames:
+        print(f"No frames found in {folder}")
+        return stats
+    print(f"{frames} frames, {labelled} with labels, {total_gt} labelled objects in the ROI")
+    for name, s in stats.items():
+        latency = s['time'] / frames * 1000
+        recall = f"{s['found'] / total_gt:.1%}" if total_gt else "n/a"
+        print(f"{name:>16}: {latency:7.1f} ms/frame  recall {recall}  "
+              f"({s['detections'] / frames:.1f} detections/frame)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and benchmark CPU detector backends.")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ)
+    parser.add_argument("--formats", nargs="*", default=[], choices=["onnx", "openvino"])
+    parser.add_argument("--int8", action="store_true", help="Also write INT8 models calibrated on --calib-dir")
+    parser.add_argument("--calib-dir", default="calib_frames", help="Folder of saved frames")
+    parser.add_argument("--calib-count", type=int, default=300, help="Maximum frames used for calibration")
+    parser.add_argument("--save-frames", type=int, default=0, help="Capture this many calibration frames first")
+    parser.add_argument("--benchmark", nargs="*", default=None, help="Backends to benchmark, e.g. torch onnx")
+    parser.add_argument("--tile-benchmark", action="store_true",
+                        help="Compare single-pass and tiled inference (latency and recall)")
+    parser.add_argument("--backend", default=None, help="Backend for --tile-benchmark")
+    parser.add_argument("--frames-dir", default=None, help="Frames (and YOLO labels) for --tile-benchmark")
+    parser.add_argument("--roi", nargs=4, type=int, metavar=("X1", "Y1", "X2", "Y2"),
+                        help="ROI for --tile-benchmark (defaults to the whole frame)")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--tile-overlap", type=float, default=TILE_OVERLAP)
+    args = parser.parse_args()
+
+    if args.save_frames:
+        save_calibration_frames(args.calib_dir, args.save_frames)
+
+    frames = load_frames(args.calib_dir, args.calib_count) if os.path.isdir(args.calib_dir) else []
+    if args.int8 and not frames:
+        parser.error(f"INT8 quantization needs saved frames in {args.calib_dir}")
+
+    if "onnx" in args.formats:
+        export_onnx(args.weights, args.imgsz)
+        if args.int8:
+            quantize_onnx(args.weights, frames, args.imgsz)
+    if "openvino" in args.formats:
+        export_openvino(args.weights, args.imgsz)
+        if args.int8:
+            quantize_openvino(args.weights, frames, args.imgsz)
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.weights, frames, args.imgsz)
+
+    if args.tile_benchmark:
+        roi = args.roi or (0, 0, 1 << 16, 1 << 16)
+        benchmark_tiled(args.backend, args.weights, args.frames_dir or args.calib_dir, roi,
+                        args.tile_size, args.tile_overlap)
+
+
+if __name__ == "__main__":
+    main()
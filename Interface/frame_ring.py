@@ -0,0 +1,148 @@
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+FRAME_SHAPE = (720, 1280, 3)  # 1280x720 BGR frames from the wide-angle camera
+RING_SLOTS = 8  # Enough slots that a slow reader is not overwritten mid-inference
+WRITING = -1  # Sequence value marking a slot that is being written
+
+
+class FrameRing:
+    """
+    A ring of preallocated BGR frame slots in multiprocessing.shared_memory.
+
+    Layout of the shared block:
+        seqs        int64[slots]         sequence number stored in each slot
+        timestamps  float64[slots]       monotonic capture time of each slot
+        frames      uint8[slots, H, W, 3]
+
+    One process writes with publish(); any number of processes attach by name
+    and read slots as NumPy views without copying. A reader checks
+    is_current(seq) after using a view to make sure the slot was not
+    overwritten while it was being read.
+    """
+
+    def __init__(self, shm, slots, shape, owner):
+        self.shm = shm
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.owner = owner
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=0)
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=shm.buf, offset=8 * slots)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=shm.buf,
+                                 offset=self._frames_offset(slots))
+        self.next_seq = 1
+
+    @staticmethod
+    def _frames_offset(slots):
+        return (16 * slots + 63) // 64 * 64  # Keep frame data cache-line aligned
+
+    @classmethod
+    def create(cls, slots=RING_SLOTS, shape=FRAME_SHAPE):
+        """Allocate a new ring (done once by the capture side)."""
+        size = cls._frames_offset(slots) + slots * int(np.prod(shape))
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        ring = cls(shm, slots, shape, owner=True)
+        ring.seqs[:] = 0
+        ring.timestamps[:] = 0.0
+        return ring
+
+    @classmethod
+    def attach(cls, spec):
+        """Attach to an existing ring from its spec() in another process."""
+        name, slots, shape = spec
+        return cls(shared_memory.SharedMemory(name=name), slots, shape, owner=False)
+
+    def spec(self):
+        """Picklable description used by worker processes to attach."""
+        return (self.shm.name, self.slots, self.shape)
+
+    def publish(self, image, timestamp):
+        """Copy a frame into the next slot and return its sequence number."""
+        seq = self.next_seq
+        slot = seq % self.slots
+        self.seqs[slot] = WRITING
+        target = self.frames[slot]
+        if image.shape == self.shape:
+            np.copyto(target, image)
+        else:
+            cv2.resize(image, (self.shape[1], self.shape[0]), dst=target)
+        self.timestamps[slot] = timestamp
+        self.seqs[slot] = seq
+        self.next_seq += 1
+        return seq
+
+    def latest(self, after_seq=0):
+        """
+        Return (seq, timestamp, view) for the newest complete frame newer than
+        after_seq, or None. The view points straight into shared memory.
+        """
+        slot = int(np.argmax(self.seqs))
+        seq = int(self.seqs[slot])
+        if seq <= after_seq:
+            return None
+        timestamp = float(self.timestamps[slot])
+        return seq, timestamp, self.frames[slot]
+
+    def get(self, seq):
+        """Return the view holding frame seq if it has not been overwritten yet."""
+        slot = seq % self.slots
+        if int(self.seqs[slot]) != seq:
+            return None
+        return self.frames[slot]
+
+    def is_current(self, seq):
+        """True if frame seq is still intact in its slot."""
+        return int(self.seqs[seq % self.slots]) == seq
+
+    def close(self):
+        """Detach from the ring; the owner also frees the shared memory."""
+        # Drop our views before closing, otherwise the buffer cannot be released
+        self.seqs = self.timestamps = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            print("Warning: Frame ring closed while a frame view was still in use.")
+        if self.owner:
+            self.shm.unlink()
+
+
+class FramePublisher:
+    """Copies frames from a capture subscriber into a FrameRing on its own thread."""
+
+    def __init__(self, capture, ring):
+        self.subscriber = capture.subscribe()
+        self.ring = ring
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.subscriber.close()
+
+    def _run(self):
+        while self.running:
+            frame = self.subscriber.read(timeout=0.5)
+            if frame is not None:
+                self.ring.publish(frame.image, frame.timestamp)
+
+
+def wait_for_frame(ring, after_seq, stop_event, poll_interval=0.002):
+    """Poll a ring until a frame newer than after_seq arrives (None once stopped)."""
+    while not stop_event.is_set():
+        latest = ring.latest(after_seq)
+        if latest is not None:
+            return latest
+        time.sleep(poll_interval)
+    return None
@@ -0,0 +1,95 @@
+import threading
+
+import cv2
+
+from frame_ring import FrameRing, FramePublisher
+from inference_worker import InferenceWorker, hand_result, hand_worker
+
+
+class HandDetector:
+    """
+    Runs MediaPipe Hands off the GUI thread and passes every result
+    (hand present, count, landmarks, capture seq and timestamp) to its
+    listeners.
+
+    With in_process=True MediaPipe runs in a worker process fed through a
+    shared-memory frame ring and a thread forwards its results; otherwise
+    MediaPipe runs on a background thread of this process. Listeners are
+    called with every result, on that thread, at camera frame rate.
+    """
+
+    def __init__(self, capture, in_process=True, max_num_hands=2, min_detection_confidence=0.5):
+        self.capture = capture
+        self.in_process = in_process
+        self.max_num_hands = max_num_hands
+        self.min_detection_confidence = min_detection_confidence
+        self.listeners = []  # Callables taking each result dict
+        self.running = False
+        self._thread = None
+        self._ring = self._publisher = self._worker = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        if self.in_process:
+            width, height = self.capture.frame_size()
+            self._ring = FrameRing.create(shape=(height, width, 3))
+            self._publisher = FramePublisher(self.capture, self._ring)
+            self._publisher.start()
+            self._worker = InferenceWorker(hand_worker, self._ring, self.max_num_hands,
+                                           self.min_detection_confidence)
+            self._worker.start()
+            target = self._forward_results
+        else:
+            target = self._detect
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._worker is not None:
+            self._worker.stop()
+            self._publisher.stop()
+            self._ring.close()
+            self._worker = self._publisher = self._ring = None
+
+    def _publish(self, result):
+        for listener in list(self.listeners):
+            try:
+                listener(result)
+            except Exception as e:
+                print(f"Error in hand result listener: {e}")
+
+    def _forward_results(self):
+        while self.running:
+            result = self._worker.get_result(timeout=0.2)
+            if result is not None:
+                self._publish(result)
+            elif not self._worker.is_alive():
+                print("Hand detection worker exited unexpectedly.")
+                break
+
+    def _detect(self):
+        import mediapipe as mp
+
+        subscriber = self.capture.subscribe()
+        hands = mp.solutions.hands.Hands(
+            static_image_mode=False,
+            max_num_hands=self.max_num_hands,
+            min_detection_confidence=self.min_detection_confidence,
+        )
+        try:
+            while self.running:
+                frame = subscriber.read(timeout=0.5)
+                if frame is None:
+                    continue
+                frame_rgb = cv2.cvtColor(frame.image, cv2.COLOR_BGR2RGB)
+                detected = hands.process(frame_rgb).multi_hand_landmarks or []
+                self._publish(hand_result(frame.seq, frame.timestamp, detected))
+        finally:
+            hands.close()
+            subscriber.close()
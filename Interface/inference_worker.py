@@ -0,0 +1,219 @@
+import multiprocessing as mp
+import queue
+import time
+
+import cv2
+
+from frame_ring import FrameRing, wait_for_frame
+
+# Spawn keeps the Tk/camera threads of the GUI process out of the workers
+_context = mp.get_context("spawn")
+
+
+class InferenceWorker:
+    """
+    Runs a worker function in a separate process.
+
+    The worker reads frames straight out of a shared FrameRing and only sends
+    small result dicts (boxes, landmarks, ...) back over a queue. With
+    configurable=True the worker also gets a control queue, so settings can
+    change between sessions without restarting the process.
+    """
+
+    def __init__(self, target, ring, *args, queue_size=8, configurable=False):
+        self.target = target
+        self.ring = ring
+        self.args = args
+        self.queue_size = queue_size
+        self.configurable = configurable
+        self.process = None
+        self.results = None
+        self.control = None
+        self.stop_event = None
+
+    def start(self):
+        self.results = _context.Queue(maxsize=self.queue_size)
+        self.stop_event = _context.Event()
+        kwargs = {}
+        if self.configurable:
+            self.control = _context.Queue()
+            kwargs['control'] = self.control
+        self.process = _context.Process(
+            target=self.target,
+            args=(self.ring.spec(), self.stop_event, self.results) + self.args,
+            kwargs=kwargs,
+            daemon=True,
+        )
+        self.process.start()
+
+    def configure(self, options):
+        """Send new settings; the worker applies them before its next frame."""
+        self.control.put(options)
+
+    def stop(self):
+        if self.process is None:
+            return
+        self.stop_event.set()
+        self.process.join(timeout=3.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def get_result(self, timeout=None):
+        """Wait for the next result (None on timeout)."""
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_latest_result(self):
+        """Drain the queue without blocking and return only the newest result."""
+        latest = None
+        while True:
+            try:
+                latest = self.results.get_nowait()
+            except queue.Empty:
+                return latest
+
+
+def _put_result(results, result):
+    """Never block the worker on a slow consumer; drop the result instead."""
+    try:
+        results.put_nowait(result)
+    except queue.Full:
+        pass
+
+
+def _read_control(control, options):
+    """Return the newest options sent over the control queue (or the current ones)."""
+    if control is None:
+        return options
+    while True:
+        try:
+            options = control.get_nowait()
+        except queue.Empty:
+            return options
+
+
+def _make_gate(options):
+    from motion_gate import MotionGate
+
+    gate_options = options.get('gate_options')
+    return MotionGate(**gate_options) if gate_options is not None else None
+
+
+def yolo_worker(ring_spec, stop_event, results, backend, weights, conf, stride=1, options=None,
+                warmup_sizes=(None,), control=None):
+    """
+    Worker process: run the detector backend on every stride-th frame in the ring.
+
+    The model is loaded and warmed up first, then a {'ready': True, ...}
+    result with the timings is sent. Options (also accepted over control):
+      roi, person_class, product_class, person_imgsz: run detect_two_pass
+      gate_options, gate_roi: skip static frames with a MotionGate; the
+        previous boxes are sent again with 'gated' set so the tracker keeps
+        its tracks alive
+    """
+    from detector_backends import detect_two_pass, load_backend, warm_up
+
+    ring = FrameRing.attach(ring_spec)
+    start = time.perf_counter()
+    detector = load_backend(backend, weights)
+    load_time = time.perf_counter() - start
+    warmup_time = warm_up(detector, ring.shape, warmup_sizes)
+    results.put({'ready': True, 'load_time': load_time, 'warmup_time': warmup_time})
+
+    options = options or {}
+    gate = _make_gate(options)
+    previous = None
+    last_seq = 0
+    try:
+        while True:
+            # Skip ahead so at least `stride` frames pass between inferences
+            latest = wait_for_frame(ring, last_seq + stride - 1 if last_seq else 0, stop_event)
+            if latest is None:
+                break
+            seq, timestamp, image = latest
+            last_seq = seq
+
+            new_options = _read_control(control, options)
+            if new_options is not options:
+                # New session settings: start the gate and the reused boxes from scratch
+                options = new_options
+                gate = _make_gate(options)
+                previous = None
+
+            if gate is not None and not gate.should_run(image, options.get('gate_roi'), timestamp) \
+                    and previous is not None:
+                _put_result(results, dict(previous, seq=seq, timestamp=timestamp, gated=True,
+                                          gate=gate.stats()))
+                continue
+
+            roi = options.get('roi')
+            if roi is not None:
+                xyxy, cls, confidences = detect_two_pass(detector, image, conf, roi, options['person_class'],
+                                                         options['product_class'],
+                                                         options.get('person_imgsz', 320))
+            else:
+                xyxy, cls, confidences = detector.predict(image, conf)
+            if not ring.is_current(seq):
+                continue  # Slot was overwritten during inference; result is unreliable
+
+            previous = {
+                'seq': seq,
+                'timestamp': timestamp,
+                'xyxy': xyxy,
+                'cls': cls,
+                'conf': confidences,
+                'gated': False,
+                'gate': gate.stats() if gate is not None else None,
+            }
+            _put_result(results, previous)
+    finally:
+        latest = image = None
+        ring.close()
+
+
+def hand_result(seq, timestamp, detected):
+    """Result dict for one frame of MediaPipe hand landmarks."""
+    return {
+        'seq': seq,
+        'timestamp': timestamp,
+        'hand_present': bool(detected),
+        'hand_count': len(detected),
+        'landmarks': [[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in detected],
+    }
+
+
+def hand_worker(ring_spec, stop_event, results, max_num_hands=2, min_detection_confidence=0.5):
+    """Worker process: run MediaPipe Hands on every new frame in the ring."""
+    import mediapipe as mp_solutions
+
+    ring = FrameRing.attach(ring_spec)
+    hands = mp_solutions.solutions.hands.Hands(
+        static_image_mode=False,
+        max_num_hands=max_num_hands,
+        min_detection_confidence=min_detection_confidence,
+    )
+    last_seq = 0
+    try:
+        while True:
+            latest = wait_for_frame(ring, last_seq, stop_event)
+            if latest is None:
+                break
+            seq, timestamp, image = latest
+            last_seq = seq
+
+            frame_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            if not ring.is_current(seq):
+                continue
+            detected = hands.process(frame_rgb).multi_hand_landmarks or []
+
+            _put_result(results, hand_result(seq, timestamp, detected))
+    finally:
+        latest = image = None
+        hands.close()
+        ring.close()
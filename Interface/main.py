@@ -2,9 +2,10 @@ import tkinter as tk
 from rotatable_camera import RotatableCameraInterface
 from rotatable_camera_2 import RotatableCameraInterface_2
 from wide_angle_camera import WideAngleCameraInterface
-import pandas as pd
+from step_store import get_step_store
 from operator_interface import OperatorInterface
 from open_detection import OpenDetectionInterface
+from detection_script import preload_detector
 
 # Function to open wide-angle camera interface
 def open_wide_camera():
@@ -31,11 +32,9 @@ def return_to_main():
     
 # Function to load available processes from CSV
 def load_available_processes():
-    try:
-        # Read the CSV file
-        df = pd.read_csv("assembly_steps.csv")
-        # Get unique process names
-        processes = df['process'].unique()
+    # Process names come from the cached step index (re-read only when the file changes)
+    processes = get_step_store().processes()
+    if processes:
         # Clear the current display
         process_list_display.config(state='normal')
         process_list_display.delete(1.0, tk.END)
@@ -43,8 +42,8 @@ def load_available_processes():
         for process in processes:
             process_list_display.insert(tk.END, f"{process}\n")
         process_list_display.config(state='disabled')  # Prevent editing
-    except FileNotFoundError:
-        # If the file doesn't exist, show a default message
+    else:
+        # If no process is saved yet, show a default message
         process_list_display.config(state='normal')
         process_list_display.delete(1.0, tk.END)
         process_list_display.insert(tk.END, "No processes available.\n")
@@ -54,56 +53,60 @@ def load_available_processes():
 def start_operator_interface():
     selected_process = current_process_entry.get().strip()
     detection_window = None
-    try:
-        # Validate and start the operator interface
-        df = pd.read_csv("assembly_steps.csv")
-        if selected_process not in df['process'].unique():
-            tk.Label(root, text="Invalid process selected!", fg="red").pack(pady=5)
-            return
-        
-        detection_window = OpenDetectionInterface()
-        detection_window.window.geometry(f"700x700+560+100")
-        
-        operator_window = OperatorInterface(selected_process, root, detection_interface=detection_window)
-        operator_window.window.geometry(f"500x700+50+100")
-        
-    except FileNotFoundError:
+    # Validate and start the operator interface
+    store = get_step_store()
+    if not store.exists():
         tk.Label(root, text="No processes saved!", fg="red").pack(pady=5)
+        return
+    if not store.has_process(selected_process):
+        tk.Label(root, text="Invalid process selected!", fg="red").pack(pady=5)
+        return
+
+    detection_window = OpenDetectionInterface()
+    detection_window.window.geometry(f"700x700+560+100")
+
+    operator_window = OperatorInterface(selected_process, root, detection_interface=detection_window)
+    operator_window.window.geometry(f"500x700+50+100")
         
-# Main GUI
-root = tk.Tk()
-root.title("Assembly Monitoring System")
+# Main GUI (guarded so worker processes can import this module safely)
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("Assembly Monitoring System")
+
+    label = tk.Label(root, text="Select The Camera", font=("Arial", 16))
+    label.pack(pady=20)
 
-label = tk.Label(root, text="Select The Camera", font=("Arial", 16))
-label.pack(pady=20)
+    # Button for wide-angle camera
+    btn_wide_camera = tk.Button(root, text="Wide-Angle Camera", command=open_wide_camera, width=20, height=2)
+    btn_wide_camera.pack(pady=10)
 
-# Button for wide-angle camera
-btn_wide_camera = tk.Button(root, text="Wide-Angle Camera", command=open_wide_camera, width=20, height=2)
-btn_wide_camera.pack(pady=10)
+    # Button for rotatable camera 1
+    btn_rotatable1 = tk.Button(root, text="Rotatable Camera 1", command=open_rotatable_camera, width=20, height=2)
+    btn_rotatable1.pack(pady=10)
 
-# Button for rotatable camera 1
-btn_rotatable1 = tk.Button(root, text="Rotatable Camera 1", command=open_rotatable_camera, width=20, height=2)
-btn_rotatable1.pack(pady=10)
+    # Button for rotatable camera 2
+    btn_rotatable2 = tk.Button(root, text="Rotatable Camera 2", command=open_rotatable_camera_2, width=20, height=2)
+    btn_rotatable2.pack(pady=10)
 
-# Button for rotatable camera 2
-btn_rotatable2 = tk.Button(root, text="Rotatable Camera 2", command=open_rotatable_camera_2, width=20, height=2)
-btn_rotatable2.pack(pady=10)
+    # Section for processes
+    process_label = tk.Label(root, text="Available Processes:", font=("Arial", 12))
+    process_label.pack(pady=10)
 
-# Section for processes
-process_label = tk.Label(root, text="Available Processes:", font=("Arial", 12))
-process_label.pack(pady=10)
+    process_list_display = tk.Text(root, height=5, width=40, state='disabled')
+    process_list_display.pack(pady=5)
 
-process_list_display = tk.Text(root, height=5, width=40, state='disabled')
-process_list_display.pack(pady=5)
+    tk.Label(root, text="Type Current Process:").pack(pady=5)
+    current_process_entry = tk.Entry(root)
+    current_process_entry.pack(pady=5)
 
-tk.Label(root, text="Type Current Process:").pack(pady=5)
-current_process_entry = tk.Entry(root)
-current_process_entry.pack(pady=5)
+    start_process_button = tk.Button(root, text="Start Current Process", command=start_operator_interface)
+    start_process_button.pack(pady=5)
 
-start_process_button = tk.Button(root, text="Start Current Process", command=start_operator_interface)
-start_process_button.pack(pady=5)
+    # Load the available processes at startup
+    load_available_processes()
 
-# Load the available processes at startup
-load_available_processes()
+    # Load and warm up the detector now so starting a process does not wait for it
+    detection_model = preload_detector()
 
-root.mainloop()
+    root.mainloop()
+    detection_model.shutdown()
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from capture_service import acquire_capture, release_capture
+from detector_backends import load_backend, warm_up
+from frame_ring import FRAME_SHAPE, FrameRing
+from inference_worker import InferenceWorker, yolo_worker
+
+LOAD_TIMEOUT = 120.0  # Seconds to wait for a worker process to load the model
+
+
+class ModelManager:
+    """
+    Loads the detector once, in the background, and keeps it warm.
+
+    In process mode the YOLO worker process and its frame ring stay alive for
+    the whole application; each detection session only starts a frame
+    publisher and sends its settings with configure(). In thread mode the
+    same backend instance is handed to every session. If camera_index is
+    given, the camera is also kept open so a session does not reopen it.
+    """
+
+    def __init__(self, backend, weights, conf, stride=1, in_process=True, warmup_sizes=(None,),
+                 camera_index=None, resolution=None):
+        self.backend = backend
+        self.weights = weights
+        self.conf = conf
+        self.stride = stride
+        self.in_process = in_process
+        self.warmup_sizes = tuple(warmup_sizes)
+        self.camera_index = camera_index
+        self.resolution = resolution
+        self.capture = None
+        self.detector = None  # Thread mode
+        self.ring = self.worker = None  # Process mode
+        self.timings = {}
+        self.error = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start loading in the background; returns immediately."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._load, daemon=True)
+            self._thread.start()
+        return self
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            shape = FRAME_SHAPE
+            if self.camera_index is not None:
+                self.capture = acquire_capture(self.camera_index, self.resolution)
+                if self.capture is not None:
+                    width, height = self.capture.frame_size()
+                    shape = (height, width, 3)
+                self.timings['camera'] = time.perf_counter() - start
+
+            if self.in_process:
+                self.ring = FrameRing.create(shape=shape)
+                self.worker = InferenceWorker(yolo_worker, self.ring, self.backend, self.weights, self.conf,
+                                              self.stride, None, self.warmup_sizes, configurable=True)
+                self.worker.start()
+                ready = self._wait_for_worker()
+                self.timings['load'] = ready['load_time']
+                self.timings['warmup'] = ready['warmup_time']
+            else:
+                load_start = time.perf_counter()
+                self.detector = load_backend(self.backend, self.weights)
+                self.timings['load'] = time.perf_counter() - load_start
+                self.timings['warmup'] = warm_up(self.detector, shape, self.warmup_sizes)
+
+            self.timings['total'] = time.perf_counter() - start
+            print(f"Detector ready in {self.timings['total']:.2f} s "
+                  f"(load {self.timings['load']:.2f} s, warm-up {self.timings['warmup']:.2f} s)")
+        except Exception as e:
+            self.error = e
+            print(f"Failed to load the detector: {e}")
+        finally:
+            self._ready.set()
+
+    def _wait_for_worker(self):
+        deadline = time.monotonic() + LOAD_TIMEOUT
+        while time.monotonic() < deadline:
+            result = self.worker.get_result(timeout=0.5)
+            if result is not None and result.get('ready'):
+                return result
+            if not self.worker.is_alive():
+                raise RuntimeError("detection worker exited while loading the model")
+        raise RuntimeError(f"detection worker did not load the model within {LOAD_TIMEOUT:.0f} s")
+
+    def wait_ready(self, timeout=None):
+        """Block until loading finished; True if the detector can be used."""
+        self.start()
+        self._ready.wait(timeout)
+        return self._ready.is_set() and self.error is None
+
+    def shutdown(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        if self.capture is not None:
+            release_capture(self.camera_index)
+            self.capture = None
@@ -0,0 +1,124 @@
+import time
+
+import cv2
+import numpy as np
+
+GATE_WIDTH = 160  # Frames are compared at this width; enough to see a hand or a box move
+PIXEL_THRESHOLD = 25  # Grey-level change that counts a pixel as changed
+FRAME_THRESHOLD = 0.01  # Fraction of changed pixels in the whole frame that triggers inference
+ROI_THRESHOLD = 0.005  # Same for the ROI, which is more sensitive since products are small
+HEARTBEAT_INTERVAL = 2.0  # Seconds between forced inferences on a static scene
+MOTION_HOLD = 0.25  # Seconds the detector keeps running on every frame after motion was seen
+
+
+class MotionGate:
+    """
+    Decides whether a frame needs a detector pass.
+
+    Each frame is converted to a small blurred greyscale image and compared
+    with the reference: the frame on which motion (or the heartbeat) last
+    triggered the detector. If neither the whole frame nor the ROI changed,
+    the previous detections can be reused. A full inference is still forced
+    every heartbeat seconds so slow changes and lighting drift are picked up.
+
+    Comparing with the reference rather than the previous frame lets slow
+    motion add up until it crosses the thresholds; frame-to-frame changes of
+    a slowly moving object are often too small to count. Because a moving
+    object then only triggers every few frames, the detector keeps running
+    on every frame for hold seconds after motion, so the tracker is fed
+    throughout continuous motion. Held frames do not move the reference.
+    """
+
+    def __init__(self, frame_threshold=FRAME_THRESHOLD, roi_threshold=ROI_THRESHOLD,
+                 heartbeat=HEARTBEAT_INTERVAL, width=GATE_WIDTH, pixel_threshold=PIXEL_THRESHOLD, hold=MOTION_HOLD):
+        self.frame_threshold = frame_threshold
+        self.roi_threshold = roi_threshold
+        self.heartbeat = heartbeat
+        self.hold = hold
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.reference = None  # Small grey frame motion or the heartbeat last ran the detector on
+        self.last_inference = None
+        self.last_motion = None
+        self.frames = 0
+        self.gated = 0  # Frames where inference was skipped
+        self.motion = 0  # Frames that ran because something moved
+        self.held = 0  # Frames that ran because something moved within the last hold seconds
+        self.heartbeats = 0  # Frames that ran only because of the heartbeat
+
+    def _small(self, image):
+        h, w = image.shape[:2]
+        scale = self.width / w
+        small = cv2.resize(image, (self.width, max(int(h * scale), 1)), interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0), scale
+
+    def scores(self, image, roi=None):
+        """Fraction of changed pixels over the whole frame and over the ROI."""
+        small, scale = self._small(image)
+        if self.reference is None or self.reference.shape != small.shape:
+            return 1.0, 1.0, small
+        changed = cv2.absdiff(small, self.reference) > self.pixel_threshold
+        frame_score = float(changed.mean())
+        roi_score = frame_score
+        if roi is not None:
+            x1, y1, x2, y2 = (int(round(v * scale)) for v in roi)
+            region = changed[max(y1, 0):max(y2, 0), max(x1, 0):max(x2, 0)]
+            roi_score = float(region.mean()) if region.size else 0.0
+        return frame_score, roi_score, small
+
+    def should_run(self, image, roi=None, now=None):
+        """Return True if the detector should run on this frame."""
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        frame_score, roi_score, small = self.scores(image, roi)
+
+        if self.reference is None:
+            self.heartbeats += 1  # First frame: nothing to compare with yet
+        elif frame_score > self.frame_threshold or roi_score > self.roi_threshold:
+            self.motion += 1
+            self.last_motion = now
+        elif self.last_motion is not None and now - self.last_motion < self.hold:
+            self.held += 1
+            self.last_inference = now
+            return True
+        elif self.last_inference is None or now - self.last_inference >= self.heartbeat:
+            self.heartbeats += 1
+        else:
+            self.gated += 1
+            return False
+
+        self.reference = small
+        self.last_inference = now
+        return True
+
+    def stats(self):
+        """Counters for logging how much inference the gate saved."""
+        return {
+            'frames': self.frames,
+            'gated': self.gated,
+            'motion': self.motion,
+            'held': self.held,
+            'heartbeat': self.heartbeats,
+            'gated_ratio': self.gated / self.frames if self.frames else 0.0,
+        }
+
+
+# Check the gate on a synthetic static scene with one moving box
+if __name__ == "__main__":
+    gate = MotionGate()
+    background = np.full((720, 1280, 3), 120, dtype=np.uint8)
+    start = time.perf_counter()
+    ran = []
+    for i in range(300):
+        frame = background.copy()
+        if 100 <= i < 130:  # Something moves slowly for one second
+            x = 400 + i * 4
+            cv2.rectangle(frame, (x, 250), (x + 60, 320), (0, 0, 255), -1)
+        if gate.should_run(frame, roi=(400, 197, 1036, 430), now=i / 30):
+            ran.append(i)
+    elapsed = (time.perf_counter() - start) / 300
+    print(f"{elapsed * 1000:.3f} ms per frame, {gate.stats()}")
+    # Every frame of the motion runs, the static scene only on heartbeats and just after the motion
+    assert all(i in ran for i in range(100, 130)), "frames skipped during continuous motion"
+    assert len(ran) <= 30 + round(30 * MOTION_HOLD) + 1 + 300 // round(30 * HEARTBEAT_INTERVAL) + 1
@@ -1,9 +1,12 @@
 import tkinter as tk
-import pandas as pd
+import queue
 import time
 from check_step_cam import CameraModule_checkstep
-import socket
-import cv2
+from step_timer import StepStateMachine
+from rpi_client import RpiClient
+from step_store import get_step_store
+
+STEP_EVENT_POLL_MS = 50  # How often the GUI picks up step events
 
 class OperatorInterface:
     def __init__(self, selected_process, parent_interface, detection_interface=None):
@@ -13,12 +16,11 @@ class OperatorInterface:
         self.detection_interface = detection_interface  # Reference to the OpenDetectionInterface
         
         # Load steps from supervisor based on selected process
-        try:
-            df = pd.read_csv("assembly_steps.csv")
-            self.steps = df[df['process'] == selected_process].to_dict('records')
-        except FileNotFoundError:
+        store = get_step_store()
+        if not store.exists():
             tk.Label(self.window, text="Error: No Steps Defined!", fg="red").grid(row=0, column=0, columnspan=2, pady=10)
             return
+        self.steps = store.get_steps(selected_process)
 
         if not self.steps:
             tk.Label(self.window, text="Error: No Steps for Selected Process!", fg="red").grid(row=0, column=0, columnspan=2, pady=10)
@@ -30,13 +32,16 @@ class OperatorInterface:
         self.step_time = 0
         self.step_zoom_factor = 1.0
 
-        # Initialize socket connection to RPi
-        self.rpi_host = "192.168.137.121"  # Replace with your RPi's IP address
-        self.rpi_port = 5000
-        self.socket = None
+        # Connection to the RPi (opened on first use)
+        self.rpi = RpiClient()
 
         # Camera feed setup
         self.camera_module = CameraModule_checkstep()
+        self.step_machine = None  # Times the current step
+        self.settling_step = None  # Step whose move is waiting for the servo-settle acknowledgement
+        self.settled_steps = queue.Queue()  # Step indices acknowledged by the RPi (from its reader thread)
+        self.step_events = queue.Queue()  # (machine, StepEvent) from the hand detector thread
+        self.camera_module.add_hand_listener(self.on_hand_result)
         self.video_label = tk.Label(self.window, bg="black")
         self.video_label.grid(row=0, column=0, columnspan=2, padx=10, pady=10)
 
@@ -71,7 +76,7 @@ class OperatorInterface:
             self.correctness_display.tag_configure("blue", foreground="blue")
             return
 
-        # Get step details from the CSV
+        # Step details are already in memory, so the move goes out as soon as the previous step completes
         step_details = self.steps[self.current_step]
         self.step_h_angle = step_details["h_angle"]
         self.step_v_angle = step_details["v_angle"]
@@ -81,128 +86,131 @@ class OperatorInterface:
         # Apply zoom factor to the camera
         self.camera_module.set_zoom_factor(self.step_zoom_factor)
 
-        # Send angles to RPi
-        self.send_angles_to_rpi()
-
         # Update UI with current step
         step_number = step_details["step_number"]
         self.step_label.config(text=f"Current Step: {step_number}")
 
-        # Start step processing
+        # Send angles to RPi; timing starts once the servos have settled
+        step_index = self.current_step
+        self.settling_step = step_index
+        if not self.send_angles_to_rpi(on_settled=lambda request_id, acknowledged: self.settled_steps.put(step_index)):
+            self.settled_steps.put(step_index)  # Not sent, nothing to wait for
+        self.wait_for_settle(step_index)
+
+    def wait_for_settle(self, step_index):
+        """Start timing the step once the RPi reports that its move has settled."""
+        if self.settling_step != step_index:
+            return  # The window closed
+        while True:
+            try:
+                settled = self.settled_steps.get_nowait()
+            except queue.Empty:
+                self.window.after(STEP_EVENT_POLL_MS, lambda: self.wait_for_settle(step_index))
+                return
+            if settled == step_index:
+                break
+
+        # Start step processing; frames captured while the camera moved are ignored
+        self.settling_step = None
         if self.current_step == 0:
-            self.first_step_hand_detected_time = 0
-            self.first_step_detection_start = None
             self.process_first_step()
         else:
             self.process_step()
 
     def process_first_step(self):
-        frame = self.camera_module.get_current_frame()
-        if frame is not None:
-            # Convert frame to RGB for MediaPipe processing
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.camera_module.mp_hands.process(frame_rgb)
-
-            if results.multi_hand_landmarks:
-                if self.first_step_detection_start is None:
-                    self.first_step_detection_start = time.time()
-                else:
-                    self.first_step_hand_detected_time += time.time() - self.first_step_detection_start
-                    self.first_step_detection_start = time.time()
-
-            else:
-                self.first_step_detection_start = None
-
-            if self.first_step_hand_detected_time >= self.step_time:
-                self.correctness_display.insert(
-                    tk.END,
-                    f"Step {self.current_step + 1}: Correct!\n",
-                    "green",
-                )
-                self.correctness_display.tag_configure("green", foreground="green")
-                self.current_step += 1
-                self.window.after(1000, self.start_step)
-                return
-
-        # Schedule the next check
-        self.window.after(100, self.process_first_step)
+        """The first step waits for the operator's hand without a time limit."""
+        self.run_step(timeout=None)
 
     def process_step(self):
-        start_time = time.time()
-        hand_detected_time = 0
-        detection_start = None
-
-        def check_hand_detection():
-            nonlocal hand_detected_time, detection_start
-            frame = self.camera_module.get_current_frame()
-            if frame is not None:
-                # Convert frame to RGB for MediaPipe processing
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.camera_module.mp_hands.process(frame_rgb)
-
-                if results.multi_hand_landmarks:
-                    if detection_start is None:
-                        detection_start = time.time()
-                    else:
-                        hand_detected_time += time.time() - detection_start
-                        detection_start = time.time()
-                else:
-                    detection_start = None
-
-                if hand_detected_time >= self.step_time:
-                    self.correctness_display.insert(
-                        tk.END,
-                        f"Step {self.current_step + 1}: Correct!\n",
-                        "green",
-                    )
-                    self.correctness_display.tag_configure("green", foreground="green")
-                    self.current_step += 1
-                    self.window.after(1000, self.start_step)
-                    return
-
-            if time.time() - start_time < 2 * self.step_time:
-                self.window.after(100, check_hand_detection)
-            else:
-                self.correctness_display.insert(
-                    tk.END,
-                    f"Step {self.current_step + 1}: Incorrect! Timeout exceeded.\n",
-                    "red",
-                )
-                self.correctness_display.tag_configure("red", foreground="red")
-                self.alert_label.config(text=f"ALERT: Step {self.current_step + 1} failed! Stopping process.")
-                self.beep_rpi()
-
-        check_hand_detection()
-
-    def send_angles_to_rpi(self):
-        try:
-            if self.socket is None:
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.socket.connect((self.rpi_host, self.rpi_port))
-
-            data = f"1,{self.step_h_angle},{self.step_v_angle}"  # 1 for cam1
-            self.socket.sendall(data.encode('utf-8'))
-            print(f"Sent angles to RPi: {data}")
-        except Exception as e:
-            print(f"Error sending angles to RPi: {e}")
-            self.socket = None
+        """Later steps fail when not completed within twice their time."""
+        self.run_step(timeout=2 * self.step_time)
+
+    def run_step(self, timeout):
+        """Time the current step from hand results; events are handled on the GUI thread."""
+        machine = StepStateMachine(self.step_time, timeout=timeout)
+        machine.start(time.monotonic())
+        self.step_machine = machine
+        self.poll_step_events(machine)
+
+    def on_hand_result(self, result):
+        """Called on the hand detector thread for every frame's result."""
+        machine = self.step_machine
+        if machine is not None:
+            for event in machine.update(result['hand_present'], result['timestamp']):
+                self.step_events.put((machine, event))
+
+    def poll_step_events(self, machine):
+        if machine is not self.step_machine:
+            return  # The step was replaced or the window closed
+        for event in machine.check(time.monotonic()):
+            self.step_events.put((machine, event))
+
+        while True:
+            try:
+                source, event = self.step_events.get_nowait()
+            except queue.Empty:
+                break
+            if source is machine and self.handle_step_event(event):
+                if self.step_machine is machine:  # The next step may already be timing
+                    self.step_machine = None
+                return
+
+        # Only picks up events; dwell time is measured on capture timestamps
+        self.window.after(STEP_EVENT_POLL_MS, lambda: self.poll_step_events(machine))
+
+    def handle_step_event(self, event):
+        """Update the display for a step event; returns True when the step is over."""
+        if event.kind == "complete":
+            self.correctness_display.insert(
+                tk.END,
+                f"Step {self.current_step + 1}: Correct!\n",
+                "green",
+            )
+            self.correctness_display.tag_configure("green", foreground="green")
+            self.current_step += 1
+            self.start_step()
+            return True
+
+        if event.kind == "timeout":
+            self.correctness_display.insert(
+                tk.END,
+                f"Step {self.current_step + 1}: Incorrect! Timeout exceeded.\n",
+                "red",
+            )
+            self.correctness_display.tag_configure("red", foreground="red")
+            self.alert_label.config(text=f"ALERT: Step {self.current_step + 1} failed! Stopping process.")
+            self.beep_rpi()
+            return True
+
+        if event.kind == "failure":
+            self.correctness_display.insert(
+                tk.END,
+                f"Step {self.current_step + 1}: Hand detection stopped.\n",
+                "red",
+            )
+            self.correctness_display.tag_configure("red", foreground="red")
+            self.alert_label.config(text=f"ALERT: No camera results during step {self.current_step + 1}.")
+            return True
+
+        return False
+
+    def send_angles_to_rpi(self, on_settled=None):
+        if self.rpi.send_angles(1, self.step_h_angle, self.step_v_angle, on_settled):  # 1 for cam1
+            print(f"Sent angles to RPi: 1,{self.step_h_angle},{self.step_v_angle}")
+            return True
+        return False
 
     def beep_rpi(self):
-        try:
-            if self.socket is None:
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.socket.connect((self.rpi_host, self.rpi_port))
-            
-            data = f"BEEP,1,3"  # 1 for cam1, 3 for 3sec
-            self.socket.sendall(data.encode('utf-8'))
-            print(f"Sent angles to RPi: {data}")
-        except Exception as e:
-            print(f"Error sending beep to RPi: {e}")
-            self.socket = None
+        if self.rpi.beep(1, 3):  # 1 for cam1, 3 for 3sec
+            print("Sent beep to RPi: BEEP,1,3")
 
     def navigate_back(self):
         """Navigate back to the parent interface."""
+        self.step_machine = None
+        self.settling_step = None
+        self.camera_module.remove_hand_listener(self.on_hand_result)
         self.camera_module.stop_feed()
+        self.rpi.close()
         if self.detection_interface:
             self.detection_interface.stop_detection()
         self.window.destroy()
@@ -1,5 +1,8 @@
 import cv2
 import pandas as pd
+from capture_service import acquire_capture, release_capture
+
+ROI_CAMERA_INDEX = 2
 
 def select_roi(camera_index=2, resolution=(1280, 720), csv_file="roi_selector.csv"):
     """
@@ -24,20 +27,16 @@ def select_roi(camera_index=2, resolution=(1280, 720), csv_file="roi_selector.cs
             drawing = False
             roi_x2, roi_y2 = x, y
 
-    # Open the camera
-    cap = cv2.VideoCapture(2)
+    # Open the camera (shared with the detection feed if it is already running)
+    capture = acquire_capture(ROI_CAMERA_INDEX, resolution)
 
-    if not cap.isOpened():
+    if capture is None:
         print("Error: Could not open camera.")
         return None, None, None, None
-
-    # Set camera resolution
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+    subscriber = capture.subscribe()
 
     # Verify resolution
-    actual_width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-    actual_height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    actual_width, actual_height = capture.frame_size()
     print(f"Camera resolution set to: {int(actual_width)}x{int(actual_height)}")
 
     # Create a window and set the mouse callback
@@ -46,10 +45,11 @@ def select_roi(camera_index=2, resolution=(1280, 720), csv_file="roi_selector.cs
 
     print("Press and drag to draw the ROI. Press 'q' to confirm selection and quit.")
     while True:
-        success, frame = cap.read()
-        if not success:
+        captured = subscriber.read(timeout=1.0)
+        if captured is None:
             print("Error: Could not read from the camera.")
             break
+        frame = captured.image.copy()  # Don't draw on the shared frame
 
         # Draw the ROI rectangle on the frame
         if roi_x1 != -1 and roi_y1 != -1 and roi_x2 != -1 and roi_y2 != -1:
@@ -64,7 +64,8 @@ def select_roi(camera_index=2, resolution=(1280, 720), csv_file="roi_selector.cs
             break
 
     # Release the camera and close the window
-    cap.release()
+    subscriber.close()
+    release_capture(ROI_CAMERA_INDEX)
     cv2.destroyAllWindows()
 
     # Save ROI to a CSV file
@@ -1,7 +1,7 @@
 import tkinter as tk
-import pandas as pd
+from step_store import get_step_store
 from cam1 import CameraModule1
-import socket
+from rpi_client import RpiClient
 
 class RotatableCameraInterface:
     def __init__(self, return_to_main_callback=None, refresh_processes_callback=None):
@@ -21,10 +21,8 @@ class RotatableCameraInterface:
         # Create an instance of camera module
         self.camera_module = CameraModule1()
 
-        # Initialize socket connection to RPi
-        self.rpi_host = "192.168.137.121"  # Replace with your RPi's IP address
-        self.rpi_port = 5000
-        self.socket = None
+        # Connection to the RPi (opened on first use)
+        self.rpi = RpiClient()
         
         # Initialize camera angles
         self.horizontal_angle = 90
@@ -154,18 +152,13 @@ class RotatableCameraInterface:
             tk.Label(self.window, text="No steps to save!", fg="red").grid(row=11, column=0, columnspan=2)
             return
 
-        # Convert the steps to a DataFrame
-        new_steps_df = pd.DataFrame(self.steps)
-        new_steps_df['step_number'] = new_steps_df.groupby('process').cumcount() + 1
-        new_steps_df = new_steps_df[['process', 'step_number', 'h_angle', 'v_angle', 'time', 'zoom_factor']]
-
-        try:
-            existing_steps_df = pd.read_csv("assembly_steps.csv")
-            combined_steps_df = pd.concat([existing_steps_df, new_steps_df], ignore_index=True)
-        except FileNotFoundError:
-            combined_steps_df = new_steps_df
-
-        combined_steps_df.to_csv("assembly_steps.csv", index=False)
+        # Number the steps per process and append only the new rows to the store
+        steps_by_process = {}
+        for step in self.steps:
+            steps_by_process.setdefault(step['process'], []).append(step)
+        store = get_step_store()
+        for process, steps in steps_by_process.items():
+            store.append_steps(process, [dict(step, step_number=number) for number, step in enumerate(steps, 1)])
         tk.Label(self.window, text="Steps Saved!", fg="green").grid(row=11, column=0, columnspan=2)
 
         if self.refresh_processes_callback:
@@ -173,21 +166,13 @@ class RotatableCameraInterface:
 
     def return_to_main(self):
         if self.return_to_main_callback:
+            self.rpi.close()
             self.window.destroy()
             self.return_to_main_callback()
 
     def send_angles_to_rpi(self):
-        try:
-            if self.socket is None:
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.socket.connect((self.rpi_host, self.rpi_port))
-
-            data = f"{1},{self.horizontal_angle},{self.vertical_angle}" # 1 for cam1
-            self.socket.sendall(data.encode('utf-8'))
-            print(f"Sent angles to RPi: {data}")
-        except Exception as e:
-            print(f"Error sending angles to RPi: {e}")
-            self.socket = None  # Reset the socket if an error occurs
+        if self.rpi.send_angles(1, self.horizontal_angle, self.vertical_angle):  # 1 for cam1
+            print(f"Sent angles to RPi: 1,{self.horizontal_angle},{self.vertical_angle}")
 
     def move_up(self):
         self.vertical_angle = min(180, self.vertical_angle + 1)
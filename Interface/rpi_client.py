@@ -0,0 +1,120 @@
+import itertools
+import socket
+import threading
+
+RPI_HOST = "192.168.137.121"  # Replace with your RPi's IP address
+RPI_PORT = 5000
+SETTLE_ACK_TIMEOUT = 3.0  # Seconds to wait for a SETTLED reply before assuming the move is done
+
+
+class RpiClient:
+    """
+    Sends servo and buzzer commands to the Raspberry Pi over one TCP
+    connection. Connects on first use and reconnects after an error.
+    Commands are newline-terminated (see rpi/protocol.py), so several can go
+    out in one write with send_many() and none are merged by TCP.
+
+    A move sent with on_settled carries a request id; the Pi answers
+    "SETTLED,<id>" once the servos should have reached the angles, and
+    on_settled(request_id, acknowledged) is called on a background
+    thread. If no reply arrives within ack_timeout it is called with
+    acknowledged=False, so a lost reply never stalls the caller.
+    """
+
+    def __init__(self, host=RPI_HOST, port=RPI_PORT, timeout=2.0, ack_timeout=SETTLE_ACK_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.ack_timeout = ack_timeout
+        self.socket = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending = {}  # request id -> (on_settled, fallback timer)
+        self._pending_lock = threading.Lock()
+
+    def send(self, data):
+        """Send one command string; returns False if it could not be sent."""
+        return self.send_many([data])
+
+    def send_many(self, commands):
+        """Send several commands in one write; returns False if they could not be sent."""
+        data = "".join(f"{command}\n" for command in commands)
+        with self._lock:
+            try:
+                if self.socket is None:
+                    self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                    threading.Thread(target=self._read_replies, args=(self.socket,), daemon=True).start()
+                self.socket.sendall(data.encode('utf-8'))
+                return True
+            except OSError as e:
+                print(f"Error sending {data!r} to RPi: {e}")
+                self._close()
+                return False
+
+    def send_angles(self, camera, h_angle, v_angle, on_settled=None):
+        if on_settled is None:
+            return self.send(f"{camera},{h_angle},{v_angle}")
+
+        request_id = next(self._ids)
+        timer = threading.Timer(self.ack_timeout, self._settled, args=(request_id, False))
+        timer.daemon = True
+        with self._pending_lock:
+            self._pending[request_id] = (on_settled, timer)
+        if not self.send(f"{camera},{h_angle},{v_angle},{request_id}"):
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            return False
+        timer.start()
+        return True
+
+    def beep(self, camera, seconds):
+        return self.send(f"BEEP,{camera},{seconds}")
+
+    def _settled(self, request_id, acknowledged):
+        with self._pending_lock:
+            pending = self._pending.pop(request_id, None)
+        if pending is None:
+            return  # Already answered (or timed out)
+        on_settled, timer = pending
+        timer.cancel()
+        try:
+            on_settled(request_id, acknowledged)
+        except Exception as e:
+            print(f"Error in settle callback: {e}")
+
+    def _read_replies(self, sock):
+        """Reads SETTLED,<id> and ERR,<id>,<reason> replies until the connection is closed."""
+        buffer = b""
+        while True:
+            try:
+                data = sock.recv(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if not data:
+                return
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                kind, _, rest = line.decode('utf-8', 'replace').strip().partition(",")
+                request_id, _, reason = rest.partition(",")
+                if not request_id.isdigit():
+                    continue
+                if kind == "SETTLED":
+                    self._settled(int(request_id), True)
+                elif kind == "ERR":
+                    print(f"RPi rejected request {request_id}: {reason}")
+                    self._settled(int(request_id), False)
+
+    def _close(self):
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+            self.socket = None
+
+    def close(self):
+        with self._lock:
+            self._close()
@@ -0,0 +1,217 @@
+"""
+Headless step verification: runs the same step sequence as the operator
+interface without a window, so one host can drive several workstations.
+
+Examples (run from the Interface folder):
+    python step_runner.py aa --station 1
+    python step_runner.py aa --station 1:1 --station 3:2 --log step_log.jsonl
+
+Each --station is CAMERA_INDEX[:RPI_CAMERA]; every station gets its own
+camera, hand detector and RPi connection and runs on its own thread.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from capture_service import acquire_capture, release_capture
+from hand_detection import HandDetector
+from rpi_client import RPI_HOST, RPI_PORT, RpiClient
+from step_store import STEPS_FILE, get_step_store
+from step_timer import StepStateMachine
+
+BEEP_SECONDS = 3
+POLL_INTERVAL = 0.05  # Seconds between timeout checks while waiting for step events
+
+
+def load_steps(process, steps_file=STEPS_FILE):
+    """Steps of a process in file order, as dicts (step_number, h_angle, v_angle, time, zoom_factor)."""
+    return get_step_store(path=steps_file).get_steps(process)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class StepLog:
+    """Structured step log: one JSON object per line. Safe to share between runners."""
+
+    def __init__(self, path=None, echo=True):
+        self.path = path
+        self.echo = echo
+        self._lock = threading.Lock()
+
+    def write(self, **record):
+        record = dict(time=datetime.now().isoformat(timespec='milliseconds'), **record)
+        line = json.dumps(record, default=_json_default)
+        with self._lock:
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(line + "\n")
+            if self.echo:
+                print(line)
+
+
+class StepRunner:
+    """
+    Verifies one process at one station: for every step it sends the servo
+    angles, waits for the RPi to report that the move has settled, then for
+    the operator's hand to dwell for the step time and,
+    like the operator interface, fails a step (with a BEEP) that is not
+    done within 2 * step_time. The first step has no limit unless
+    first_step_timeout is given. Use run() directly as an API.
+    """
+
+    def __init__(self, process, camera_index, rpi_camera=1, steps=None, steps_file=STEPS_FILE,
+                 rpi=None, log=None, station=None, in_process=True, first_step_timeout=None):
+        self.process = process
+        self.camera_index = camera_index
+        self.rpi_camera = rpi_camera
+        self.steps = steps if steps is not None else load_steps(process, steps_file)
+        self.rpi = rpi or RpiClient()
+        self.log = log or StepLog()
+        self.station = station or f"camera{camera_index}"
+        self.in_process = in_process
+        self.first_step_timeout = first_step_timeout
+        self.machine = None
+        self.events = queue.Queue()  # (machine, StepEvent) from the hand detector thread
+
+    def _on_hand_result(self, result):
+        machine = self.machine
+        if machine is not None:
+            for event in machine.update(result['hand_present'], result['timestamp']):
+                self.events.put((machine, event))
+
+    def _record(self, event, **fields):
+        self.log.write(station=self.station, process=self.process, event=event, **fields)
+
+    def run(self, stop_event=None):
+        """Run all steps; returns a summary dict with one entry per step attempted."""
+        stop_event = stop_event or threading.Event()
+        summary = {'station': self.station, 'process': self.process, 'completed': False, 'steps': []}
+        if not self.steps:
+            self._record("error", message="No steps for this process")
+            return summary
+
+        capture = acquire_capture(self.camera_index)
+        if capture is None:
+            self._record("error", message=f"Could not open camera {self.camera_index}")
+            return summary
+        detector = HandDetector(capture, self.in_process)
+        detector.listeners.append(self._on_hand_result)
+        detector.start()
+        self._record("process_start", steps=len(self.steps))
+        try:
+            for index, step in enumerate(self.steps):
+                timeout = self.first_step_timeout if index == 0 else 2 * step['time']
+                outcome = self._run_step(step, timeout, stop_event)
+                summary['steps'].append(outcome)
+                if outcome['result'] != "complete":
+                    break
+            else:
+                summary['completed'] = True
+        finally:
+            self.machine = None
+            detector.stop()
+            release_capture(self.camera_index)
+            self.rpi.close()
+        self._record("process_end", completed=summary['completed'])
+        return summary
+
+    def _run_step(self, step, timeout, stop_event):
+        step_number = step['step_number']
+        settled = threading.Event()
+        acknowledged = []
+        move_start = time.monotonic()
+        if self.rpi.send_angles(self.rpi_camera, step['h_angle'], step['v_angle'],
+                                on_settled=lambda request_id, ack: (acknowledged.append(ack), settled.set())):
+            while not settled.wait(POLL_INTERVAL):  # Don't time the step while the camera moves
+                if stop_event.is_set():
+                    self._record("aborted", step=step_number)
+                    return {'step': step_number, 'result': "aborted", 'dwell': 0.0, 'elapsed': 0.0}
+        self._record("step_start", step=step_number, h_angle=step['h_angle'], v_angle=step['v_angle'],
+                     required_time=step['time'], timeout=timeout, settle=round(time.monotonic() - move_start, 3),
+                     settle_acknowledged=bool(acknowledged and acknowledged[0]))
+
+        machine = StepStateMachine(step['time'], timeout=timeout)
+        start = time.monotonic()
+        machine.start(start)
+        self.machine = machine
+        while not stop_event.is_set():
+            for event in machine.check(time.monotonic()):
+                self.events.put((machine, event))
+            try:
+                source, event = self.events.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if source is not machine:
+                continue
+            self._record(event.kind, step=step_number, dwell=round(event.dwell, 3),
+                         elapsed=round(event.timestamp - start, 3))
+            if event.kind == "timeout":
+                self.rpi.beep(self.rpi_camera, BEEP_SECONDS)
+            if event.kind in ("complete", "timeout", "failure"):
+                return {'step': step_number, 'result': event.kind, 'dwell': event.dwell,
+                        'elapsed': event.timestamp - start}
+
+        self._record("aborted", step=step_number)
+        return {'step': step_number, 'result': "aborted", 'dwell': machine.dwell,
+                'elapsed': time.monotonic() - start}
+
+
+def parse_station(text):
+    """CAMERA_INDEX[:RPI_CAMERA] -> (camera_index, rpi_camera)."""
+    camera, _, rpi_camera = text.partition(":")
+    return int(camera), int(rpi_camera or 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run step verification without the GUI.")
+    parser.add_argument("process", help="Process name from the steps file")
+    parser.add_argument("--station", action="append", type=parse_station, default=None,
+                        help="CAMERA_INDEX[:RPI_CAMERA], repeat for several stations (default 1:1)")
+    parser.add_argument("--steps-file", default=STEPS_FILE)
+    parser.add_argument("--rpi-host", default=RPI_HOST)
+    parser.add_argument("--rpi-port", type=int, default=RPI_PORT)
+    parser.add_argument("--log", default="step_log.jsonl", help="JSON-lines result log")
+    parser.add_argument("--first-step-timeout", type=float, default=None)
+    parser.add_argument("--in-thread", action="store_true", help="Run MediaPipe in a thread, not a process")
+    args = parser.parse_args()
+
+    steps = load_steps(args.process, args.steps_file)
+    if not steps:
+        parser.error(f"No steps for process '{args.process}' in {args.steps_file}")
+
+    log = StepLog(args.log)
+    stop_event = threading.Event()
+    summaries = []
+    threads = []
+    for camera_index, rpi_camera in args.station or [(1, 1)]:
+        runner = StepRunner(args.process, camera_index, rpi_camera, steps=steps,
+                            rpi=RpiClient(args.rpi_host, args.rpi_port), log=log,
+                            in_process=not args.in_thread, first_step_timeout=args.first_step_timeout)
+        thread = threading.Thread(target=lambda r=runner: summaries.append(r.run(stop_event)))
+        thread.start()
+        threads.append(thread)
+
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        stop_event.set()
+    for thread in threads:
+        thread.join()
+
+    failed = [s['station'] for s in summaries if not s['completed']]
+    print(f"{len(summaries) - len(failed)} of {len(summaries)} stations completed '{args.process}'")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
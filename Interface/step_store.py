@@ -0,0 +1,186 @@
+import csv
+import os
+import sqlite3
+import threading
+
+STEPS_FILE = "assembly_steps.csv"
+STEP_COLUMNS = ['process', 'step_number', 'h_angle', 'v_angle', 'time', 'zoom_factor']
+# Backend for the process plans: "csv" (assembly_steps.csv) or "sqlite"
+STEP_STORE_BACKEND = os.environ.get("STEP_STORE_BACKEND", "csv")
+SQLITE_FILE = "assembly_steps.db"
+
+
+def _number(text):
+    """Parse a CSV cell as int if possible, else float (as pandas would)."""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _row(process, step):
+    return {'process': process, **{c: step[c] for c in STEP_COLUMNS[1:]}}
+
+
+class CsvStepStore:
+    """
+    Process plans kept in assembly_steps.csv with an in-memory index from
+    process name to its ordered steps.
+
+    The index is rebuilt only when the file's mtime or size changes, so
+    repeated lookups from the GUI cost nothing. Appending a process writes
+    only the new rows and updates the index in place; replacing a process
+    has to rewrite the file (done atomically).
+    """
+
+    def __init__(self, path=STEPS_FILE):
+        self.path = path
+        self._index = {}  # process -> list of step dicts, in file order
+        self._stamp = None  # (mtime_ns, size) the index was built from
+        self._lock = threading.RLock()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        index = {}
+        if stamp is not None:
+            with open(self.path, newline="") as f:
+                for row in csv.DictReader(f):
+                    step = {'process': row['process']}
+                    for column in STEP_COLUMNS[1:]:
+                        step[column] = _number(row[column])
+                    index.setdefault(row['process'], []).append(step)
+        self._index = index
+        self._stamp = stamp
+
+    def exists(self):
+        return self._file_stamp() is not None
+
+    def processes(self):
+        """Process names in the order they first appear."""
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    def has_process(self, process):
+        with self._lock:
+            self._refresh()
+            return process in self._index
+
+    def get_steps(self, process):
+        """Ordered steps of a process (copies), [] if it is unknown."""
+        with self._lock:
+            self._refresh()
+            return [dict(step) for step in self._index.get(process, [])]
+
+    def append_steps(self, process, steps):
+        """Append steps to a process without rewriting the rest of the file."""
+        rows = [_row(process, step) for step in steps]
+        with self._lock:
+            self._refresh()
+            new_file = self._stamp is None or self._stamp[1] == 0
+            with open(self.path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=STEP_COLUMNS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(rows)
+            self._index.setdefault(process, []).extend(rows)
+            self._stamp = self._file_stamp()
+
+    def replace_steps(self, process, steps):
+        """Replace all steps of a process (rewrites the CSV file)."""
+        with self._lock:
+            self._refresh()
+            self._index[process] = [_row(process, step) for step in steps]
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=STEP_COLUMNS)
+                writer.writeheader()
+                for rows in self._index.values():
+                    writer.writerows(rows)
+            os.replace(temp_path, self.path)
+            self._stamp = self._file_stamp()
+
+
+class SqliteStepStore:
+    """
+    Process plans in an SQLite table indexed by process, so appending or
+    replacing one process only touches its own rows. The first time it is
+    opened it imports an existing assembly_steps.csv.
+    """
+
+    def __init__(self, path=SQLITE_FILE, import_csv=STEPS_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS steps ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, process TEXT NOT NULL, step_number INTEGER, "
+                "h_angle NUMERIC, v_angle NUMERIC, time NUMERIC, zoom_factor NUMERIC)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS steps_process ON steps (process, id)")
+        empty = self._db.execute("SELECT COUNT(*) FROM steps").fetchone()[0] == 0
+        if empty and import_csv and os.path.exists(import_csv):
+            csv_store = CsvStepStore(import_csv)
+            with self._db:
+                for process in csv_store.processes():
+                    self._insert(process, csv_store.get_steps(process))
+
+    def exists(self):
+        return True
+
+    def processes(self):
+        with self._lock:
+            rows = self._db.execute("SELECT process FROM steps GROUP BY process ORDER BY MIN(id)")
+            return [process for process, in rows]
+
+    def has_process(self, process):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM steps WHERE process = ? LIMIT 1", (process,)).fetchone() is not None
+
+    def get_steps(self, process):
+        with self._lock:
+            rows = self._db.execute(f"SELECT {', '.join(STEP_COLUMNS)} FROM steps WHERE process = ? ORDER BY id",
+                                    (process,))
+            return [dict(zip(STEP_COLUMNS, row)) for row in rows]
+
+    def _insert(self, process, steps):
+        rows = [tuple(_row(process, step)[c] for c in STEP_COLUMNS) for step in steps]
+        self._db.executemany(f"INSERT INTO steps ({', '.join(STEP_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def append_steps(self, process, steps):
+        with self._lock, self._db:
+            self._insert(process, steps)
+
+    def replace_steps(self, process, steps):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM steps WHERE process = ?", (process,))
+            self._insert(process, steps)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_step_store(backend=None, path=None):
+    """Shared store for a backend, so every window uses the same index."""
+    backend = backend or STEP_STORE_BACKEND
+    key = (backend, path)
+    with _stores_lock:
+        if key not in _stores:
+            if backend == "sqlite":
+                _stores[key] = SqliteStepStore(path or SQLITE_FILE)
+            elif backend == "csv":
+                _stores[key] = CsvStepStore(path or STEPS_FILE)
+            else:
+                raise ValueError(f"Unknown step store backend '{backend}', expected 'csv' or 'sqlite'")
+        return _stores[key]
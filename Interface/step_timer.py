@@ -0,0 +1,112 @@
+import threading
+from collections import namedtuple
+
+DROPOUT_TOLERANCE = 0.3  # Seconds a hand may disappear without breaking the dwell time
+STALL_TIMEOUT = 3.0  # Seconds without any hand result before the step is failed
+
+# Step states
+WAITING = "waiting"  # No hand on the step yet (or it left)
+HAND_PRESENT = "hand_present"
+COMPLETE = "complete"
+TIMED_OUT = "timed_out"
+FAILED = "failed"
+
+# kind is one of "hand_on", "hand_off", "complete", "timeout" or "failure"
+StepEvent = namedtuple("StepEvent", ["kind", "timestamp", "dwell"])
+
+
+class StepStateMachine:
+    """
+    Times one assembly step from hand-presence observations.
+
+    update() is fed every hand result with its monotonic capture timestamp,
+    so dwell time is measured between the frames themselves rather than
+    between GUI polls. While the hand stays present the time between
+    consecutive frames is added; a gap where the hand is missing for at most
+    dropout_tolerance seconds is bridged and counted too, a longer one is not.
+
+    The step completes once dwell >= required_time. With a timeout it times
+    out when that much time passes after start() without completing. Once
+    results have started arriving it fails if none arrive for stall_timeout
+    seconds (camera or detector stopped); the wait for the first result is
+    left to the timeout, since the detector may still be starting up.
+    check(now) evaluates both without a new frame.
+    Methods are thread-safe; each call returns the events it produced.
+    """
+
+    def __init__(self, required_time, timeout=None, dropout_tolerance=DROPOUT_TOLERANCE,
+                 stall_timeout=STALL_TIMEOUT):
+        self.required_time = required_time
+        self.timeout = timeout
+        self.dropout_tolerance = dropout_tolerance
+        self.stall_timeout = stall_timeout
+        self.state = WAITING
+        self.dwell = 0.0
+        self.start_time = None
+        self.last_timestamp = None  # Capture time of the last observation
+        self.last_present = None  # Capture time the hand was last seen
+        self.previous_present = False
+        self.observations = 0
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.state in (COMPLETE, TIMED_OUT, FAILED)
+
+    def start(self, timestamp):
+        with self._lock:
+            self.state = WAITING
+            self.dwell = 0.0
+            self.start_time = self.last_timestamp = timestamp
+            self.last_present = None
+            self.previous_present = False
+            self.observations = 0
+
+    def update(self, hand_present, timestamp):
+        """Feed one observation; returns the list of StepEvents it caused."""
+        with self._lock:
+            if self.finished or self.start_time is None or timestamp <= self.last_timestamp:
+                return []  # Finished, not started, or a frame from before the step began
+            events = []
+
+            if hand_present:
+                if self.previous_present:
+                    self.dwell += timestamp - self.last_timestamp
+                elif self.last_present is not None and timestamp - self.last_present <= self.dropout_tolerance:
+                    self.dwell += timestamp - self.last_present  # Bridge a brief dropout
+                if self.state == WAITING:
+                    self.state = HAND_PRESENT
+                    events.append(StepEvent("hand_on", timestamp, self.dwell))
+                self.last_present = timestamp
+            elif (self.state == HAND_PRESENT and self.last_present is not None
+                  and timestamp - self.last_present > self.dropout_tolerance):
+                self.state = WAITING
+                events.append(StepEvent("hand_off", timestamp, self.dwell))
+
+            self.previous_present = hand_present
+            self.last_timestamp = timestamp
+            self.observations += 1
+
+            if self.dwell >= self.required_time:
+                self.state = COMPLETE
+                events.append(StepEvent("complete", timestamp, self.dwell))
+            else:
+                events.extend(self._check(timestamp))
+            return events
+
+    def check(self, now):
+        """Evaluate timeout and stall at time now (no new observation needed)."""
+        with self._lock:
+            return self._check(now)
+
+    def _check(self, now):
+        if self.finished or self.start_time is None:
+            return []
+        if self.timeout is not None and now - self.start_time >= self.timeout:
+            self.state = TIMED_OUT
+            return [StepEvent("timeout", now, self.dwell)]
+        if (self.stall_timeout is not None and self.observations
+                and now - self.last_timestamp >= self.stall_timeout):
+            self.state = FAILED
+            return [StepEvent("failure", now, self.dwell)]
+        return []
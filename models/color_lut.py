@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+
+import cv2
+import numpy as np
+
+# Default palette of clothing colors (RGB)
+PALETTE = {
+    "Red": (255, 0, 0),
+    "Green": (0, 255, 0),
+    "Blue": (0, 0, 255),
+    "Yellow": (255, 255, 0),
+    "Orange": (255, 165, 0),
+    "Purple": (128, 0, 128),
+    "Cyan": (0, 255, 255),
+    "Pink": (255, 192, 203),
+    "Black": (0, 0, 0),
+    "White": (255, 255, 255),
+    "Gray": (128, 128, 128),
+    "Brown": (165, 42, 42)
+}
+
+LUT_BITS = 5  # 2**5 = 32 cells per channel, 32x32x32 table
+COLOR_SPACE = "rgb"  # "rgb" (plain Euclidean RGB, as the original naming) or "lab" (perceptual distance)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "color_lut_cache")
+
+
+def _to_space(rgb, space):
+    """Convert an (N, 3) RGB array (0-255) to the space distances are measured in."""
+    rgb = np.asarray(rgb, dtype=np.float32).reshape(-1, 1, 3)
+    if space == "lab":
+        return cv2.cvtColor(rgb / 255.0, cv2.COLOR_RGB2Lab).reshape(-1, 3)
+    return rgb.reshape(-1, 3)
+
+
+def palette_hash(palette, bits=LUT_BITS, space=COLOR_SPACE):
+    """Short hash identifying a palette and table layout, used as the cache key."""
+    key = json.dumps({'palette': [[name, list(rgb)] for name, rgb in palette.items()],
+                      'bits': bits, 'space': space})
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def build_lut(palette, bits=LUT_BITS, space=COLOR_SPACE):
+    """
+    Map the centre of every quantized RGB cell to the index of the nearest
+    palette color. Returns a uint8 table indexed as lut[r, g, b].
+    """
+    levels = 1 << bits
+    centers = (np.arange(levels, dtype=np.float32) + 0.5) * (256 / levels)
+    r, g, b = np.meshgrid(centers, centers, centers, indexing="ij")
+    cells = _to_space(np.stack((r, g, b), axis=-1).reshape(-1, 3), space)
+    colors = _to_space(list(palette.values()), space)
+
+    distances = ((cells[:, None, :] - colors[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1).astype(np.uint8).reshape(levels, levels, levels)
+
+
+class ColorNamer:
+    """
+    Names colors with a precomputed lookup table instead of searching the
+    palette on every call. The table is built once per palette and cached on
+    disk under its palette hash.
+    """
+
+    def __init__(self, palette=PALETTE, bits=LUT_BITS, space=COLOR_SPACE, cache_dir=CACHE_DIR):
+        self.names = list(palette)
+        self.shift = 8 - bits
+        self.lut = self._load_or_build(palette, bits, space, cache_dir)
+        self._names = np.array(self.names + ["Unknown"])
+
+    @staticmethod
+    def _load_or_build(palette, bits, space, cache_dir):
+        path = os.path.join(cache_dir, f"color_lut_{palette_hash(palette, bits, space)}.npy") if cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                return np.load(path)
+            except (OSError, ValueError):
+                print(f"Warning: Could not read {path}, rebuilding the color table.")
+
+        lut = build_lut(palette, bits, space)
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.save(path, lut)
+            except OSError as e:
+                print(f"Warning: Could not cache the color table: {e}")
+        return lut
+
+    def indices(self, bgr_colors):
+        """Palette indices for an (N, 3) array of BGR colors."""
+        bgr = np.clip(np.asarray(bgr_colors, dtype=np.float32).reshape(-1, 3), 0, 255).astype(np.uint8)
+        bgr >>= self.shift
+        return self.lut[bgr[:, 2], bgr[:, 1], bgr[:, 0]]
+
+    def names_for(self, bgr_colors):
+        """Color names for an (N, 3) array of BGR colors (NaN rows give "Unknown")."""
+        bgr_colors = np.asarray(bgr_colors, dtype=np.float32).reshape(-1, 3)
+        valid = ~np.isnan(bgr_colors).any(axis=1)
+        indices = np.full(len(bgr_colors), len(self.names))
+        indices[valid] = self.indices(bgr_colors[valid])
+        return self._names[indices].tolist()
+
+    def name(self, bgr_color):
+        """Color name of a single BGR color."""
+        return self.names[int(self.indices(bgr_color)[0])]
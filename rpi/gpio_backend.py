@@ -0,0 +1,162 @@
+"""
+GPIO backends for the servo server.
+
+main.py talks to the pins through the small subset of the pigpio API it
+needs (set_mode, write, set_bank_1, clear_bank_1, set_servo_pulsewidth,
+stop). PigpioBackend forwards to the pigpio daemon; SimulatedPi keeps the
+pin state in memory and records every change with a timestamp, so the
+server can run on any Linux box (GPIO_BACKEND=sim python main.py) and
+timelines such as beep durations can be checked. Pair SimulatedPi with a
+VirtualClock to drive time by hand, either for a GpioScheduler on its own
+or for the whole server: main.init_gpio("sim", clock) makes the servo
+trajectories, beeps and SETTLED replies follow that clock, and
+main.run_for() advances it.
+
+Run this file for a virtual-clock example.
+"""
+import time
+
+OUTPUT = 1  # Same value as pigpio.OUTPUT
+BACKENDS = ("pigpio", "sim")
+
+
+class PigpioBackend:
+    """The real pins, through the pigpio daemon."""
+
+    def __init__(self, host=None, port=None):
+        import pigpio
+
+        self._pi = pigpio.pi(*[arg for arg in (host, port) if arg is not None])
+        self.connected = self._pi.connected
+
+    def set_mode(self, pin, mode):
+        self._pi.set_mode(pin, mode)
+
+    def write(self, pin, level):
+        self._pi.write(pin, level)
+
+    def set_bank_1(self, bits):
+        self._pi.set_bank_1(bits)
+
+    def clear_bank_1(self, bits):
+        self._pi.clear_bank_1(bits)
+
+    def set_servo_pulsewidth(self, pin, pulsewidth):
+        self._pi.set_servo_pulsewidth(pin, pulsewidth)
+
+    def stop(self):
+        self._pi.stop()
+
+
+class VirtualClock:
+    """Clock that only moves when advance() is called; use it wherever a clock callable is taken."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+        return self.now
+
+
+class SimulatedPi:
+    """
+    In-memory pins. Every change is appended to events as
+    (time, pin, kind, value) with kind "level" or "servo"; writes that do
+    not change anything are recorded too, so redundant writes can be
+    counted. Bank writes are recorded per pin with the same timestamp.
+    """
+
+    connected = True
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.modes = {}
+        self.levels = {}  # pin -> 0/1
+        self.pulse_widths = {}  # pin -> microseconds (0 = servo off)
+        self.events = []
+        self.bank_writes = 0
+
+    def set_mode(self, pin, mode):
+        self.modes[pin] = mode
+
+    def _set_level(self, pin, level, now):
+        self.levels[pin] = level
+        self.events.append((now, pin, "level", level))
+
+    def write(self, pin, level):
+        self._set_level(pin, int(bool(level)), self.clock())
+
+    def _bank(self, bits, level):
+        now = self.clock()
+        self.bank_writes += 1
+        for pin in range(32):
+            if bits >> pin & 1:
+                self._set_level(pin, level, now)
+
+    def set_bank_1(self, bits):
+        self._bank(bits, 1)
+
+    def clear_bank_1(self, bits):
+        self._bank(bits, 0)
+
+    def set_servo_pulsewidth(self, pin, pulsewidth):
+        self.pulse_widths[pin] = pulsewidth
+        self.events.append((self.clock(), pin, "servo", pulsewidth))
+
+    def stop(self):
+        self.connected = False
+
+    def level(self, pin):
+        return self.levels.get(pin, 0)
+
+    def timeline(self, pin, kind="level"):
+        """[(time, value)] of a pin, consecutive duplicates removed."""
+        result = []
+        for timestamp, event_pin, event_kind, value in self.events:
+            if event_pin == pin and event_kind == kind and (not result or result[-1][1] != value):
+                result.append((timestamp, value))
+        return result
+
+    def high_intervals(self, pin):
+        """[(start, end)] while a pin was high; end is None if it still is (e.g. beep durations)."""
+        intervals = []
+        start = None
+        for timestamp, level in self.timeline(pin):
+            if level and start is None:
+                start = timestamp
+            elif not level and start is not None:
+                intervals.append((start, timestamp))
+                start = None
+        if start is not None:
+            intervals.append((start, None))
+        return intervals
+
+
+def open_backend(name="pigpio", clock=time.monotonic):
+    """Backend by name: "pigpio" (the daemon) or "sim" (in memory)."""
+    if name == "pigpio":
+        return PigpioBackend()
+    if name == "sim":
+        return SimulatedPi(clock)
+    raise ValueError(f"Unknown GPIO backend '{name}', expected one of {BACKENDS}")
+
+
+if __name__ == "__main__":
+    from gpio_scheduler import GpioScheduler, mask
+
+    # Overlapping beeps on a virtual clock: a 0.3 s beep extended by a 0.5 s one 0.1 s later
+    clock = VirtualClock()
+    sim = SimulatedPi(clock)
+    scheduler = GpioScheduler(sim, clock=clock)
+    buzzer = 5
+    scheduler.write(set_mask=mask(buzzer))
+    scheduler.at(0.3, "buzzer", clear_mask=mask(buzzer), extend=True)
+    clock.advance(0.1)
+    scheduler.at(0.5, "buzzer", clear_mask=mask(buzzer), extend=True)
+    while clock() < 1.0:
+        scheduler.poll(clock.advance(scheduler.wheel.tick))
+    print(f"Buzzer high: {[(round(start, 2), round(end, 2)) for start, end in sim.high_intervals(buzzer)]}")
@@ -0,0 +1,159 @@
+"""
+Timed GPIO actions for the LEDs and buzzers.
+
+All pin changes go through one GpioScheduler: immediate changes are written
+with a single set_bank_1/clear_bank_1 pair, so LEDs and buzzer switch
+together, and delayed ones (buzzer off, LED patterns, idle blink) sit in a
+hashed timer wheel that is advanced by one task. main.py also runs the
+servo updates and move acknowledgements from the wheel, so one clock
+drives all server timing. Nothing sleeps while handling a command and no
+thread is started per beep.
+"""
+import asyncio
+import math
+import time
+
+TICK = 0.01  # Wheel resolution in seconds
+WHEEL_SLOTS = 128  # Slots per revolution (1.28 s at TICK=0.01); later timers wait extra rounds
+
+
+def mask(*pins):
+    """Bank-1 bit mask of the given GPIO pins."""
+    bits = 0
+    for pin in pins:
+        bits |= 1 << pin
+    return bits
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel keyed by name. Scheduling or cancelling a timer is
+    O(1); advancing only looks at the slots of the ticks that passed.
+    Scheduling an existing key replaces its timer.
+    """
+
+    def __init__(self, tick=TICK, slots=WHEEL_SLOTS, start=0.0):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]
+        self.current = math.floor(start / tick)  # Last tick processed
+        self.timers = {}  # key -> (tick index, value)
+
+    def schedule(self, deadline, key, value):
+        self.cancel(key)
+        index = max(self.current + 1, math.ceil(deadline / self.tick))
+        self.slots[index % len(self.slots)][key] = (index, value)
+        self.timers[key] = (index, value)
+
+    def deadline(self, key):
+        """When the timer for key fires (rounded up to a tick), or None."""
+        entry = self.timers.get(key)
+        return None if entry is None else entry[0] * self.tick
+
+    def cancel(self, key):
+        entry = self.timers.pop(key, None)
+        if entry is not None:
+            del self.slots[entry[0] % len(self.slots)][key]
+
+    def advance(self, now):
+        """Remove and return the (key, value) timers due by now, earliest first."""
+        target = math.floor(now / self.tick)
+        if target <= self.current:
+            return []
+        due = []
+        if target - self.current >= len(self.slots):
+            # Fell behind by a whole revolution: one pass over every slot
+            for slot in self.slots:
+                due.extend((index, key) for key, (index, _) in slot.items() if index <= target)
+        else:
+            for index in range(self.current + 1, target + 1):
+                slot = self.slots[index % len(self.slots)]
+                due.extend((index, key) for key, (timer_index, _) in slot.items() if timer_index <= index)
+        self.current = target
+        due.sort(key=lambda item: item[0])
+        result = []
+        for _, key in due:
+            index, value = self.timers.pop(key)
+            del self.slots[index % len(self.slots)][key]
+            result.append((key, value))
+        return result
+
+
+class GpioScheduler:
+    """
+    Writes LED/buzzer pins through bank writes and runs delayed changes from
+    a TimerWheel. Delayed changes are keyed, so a new request for the same
+    key (e.g. ("buzzer", cam_id)) replaces the old one, or with extend=True
+    only moves it later: overlapping beeps merge into one longer beep.
+    Pins already at the requested level are not written again.
+    """
+
+    def __init__(self, pi, tick=TICK, clock=time.monotonic):
+        self.pi = pi
+        self.clock = clock
+        self.wheel = TimerWheel(tick, start=clock())
+        self.levels = 0  # Bit mask of the pins this scheduler has driven high
+        self.bank_writes = 0
+
+    def write(self, set_mask=0, clear_mask=0):
+        """Change pins now; pins in both masks end up set."""
+        clear_mask &= ~set_mask
+        set_mask &= ~self.levels
+        clear_mask &= self.levels
+        if set_mask:
+            self.pi.set_bank_1(set_mask)
+            self.bank_writes += 1
+        if clear_mask:
+            self.pi.clear_bank_1(clear_mask)
+            self.bank_writes += 1
+        self.levels = (self.levels | set_mask) & ~clear_mask
+
+    def _deadline(self, delay):
+        if not math.isfinite(delay) or delay < 0:
+            raise ValueError(f"delay must be a finite number of seconds >= 0, got {delay}")
+        return self.clock() + delay
+
+    def at(self, delay, key, set_mask=0, clear_mask=0, extend=False):
+        """Change pins after delay seconds. With extend, an existing later timer for key is kept."""
+        deadline = self._deadline(delay)
+        if extend:
+            existing = self.wheel.deadline(key)
+            if existing is not None and existing >= deadline:
+                return
+        self.wheel.schedule(deadline, key, (None, set_mask, clear_mask))
+
+    def call_at(self, delay, key, callback):
+        """Call callback() once after delay seconds; it may return (set_mask, clear_mask)."""
+        self.wheel.schedule(self._deadline(delay), key, ((None, callback), 0, 0))
+
+    def every(self, interval, key, callback):
+        """Call callback() every interval seconds; it returns (set_mask, clear_mask)."""
+        self.wheel.schedule(self.clock() + interval, key, ((interval, callback), 0, 0))
+
+    def pending(self, key):
+        """True while a timer for key is scheduled."""
+        return self.wheel.deadline(key) is not None
+
+    def cancel(self, key):
+        self.wheel.cancel(key)
+
+    def poll(self, now=None):
+        """Apply every change due by now as one combined bank write."""
+        now = self.clock() if now is None else now
+        set_mask = clear_mask = 0
+        for key, (repeat, set_bits, clear_bits) in self.wheel.advance(now):
+            if repeat is not None:
+                interval, callback = repeat
+                set_bits, clear_bits = callback() or (0, 0)
+                if interval is not None:
+                    self.wheel.schedule(now + interval, key, (repeat, 0, 0))
+            # Later changes win over earlier ones for the same pin
+            set_mask = (set_mask & ~clear_bits) | set_bits
+            clear_mask = (clear_mask & ~set_bits) | clear_bits
+        if set_mask or clear_mask:
+            self.write(set_mask, clear_mask)
+
+    async def run(self):
+        """Advance the wheel every tick (run as an asyncio task)."""
+        while True:
+            self.poll()
+            await asyncio.sleep(self.wheel.tick)
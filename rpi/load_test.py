@@ -0,0 +1,289 @@
+"""
+Load generator and latency benchmark for the servo/LED command server.
+
+Examples (run from the rpi folder):
+    python load_test.py --local --clients 3 --duration 10
+    python load_test.py --host 192.168.137.121 --patterns jog --rate 50 --burst 5
+    python load_test.py --local --malformed-every 20 --output load_report.json
+
+Each client connection replays one pattern (assigned round robin from
+--patterns) at --rate commands per second, --burst commands per write:
+    jog   1 degree moves back and forth, like rapid jog clicks
+    step  large moves between assembly step positions
+    beep  short BEEP commands
+Every command carries a request id. The apply latency is measured from
+sending a move to its MOVING reply (sent when the server applies the move,
+coalesced or not), the settle latency up to SETTLED, and the beep latency
+up to OK. Malformed lines (--malformed-every) carry an id too and must
+be answered with ERR. Server counters and CPU time come from the STATS command, so
+they work against the real Pi too. --local starts main.py with the
+simulated GPIO backend on a free port.
+
+The report is printed as JSON (and written to --output) to track regressions.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+PATTERNS = ("jog", "step", "beep")
+STEP_TARGETS = [(154, 90), (126, 90), (90, 60), (60, 120)]  # Step-sized moves
+JOG_RANGE = (80, 100)  # Jog moves sweep this horizontal range one degree at a time
+BEEP_SECONDS = 0.05
+REPLY_GRACE = 3.0  # Seconds to wait for outstanding replies after sending stops
+
+
+def percentiles(values):
+    """p50/p95/p99/max in milliseconds (nearest rank), or None without samples."""
+    if not values:
+        return None
+    values = sorted(values)
+
+    def rank(q):
+        return values[min(len(values) - 1, max(0, round(q * len(values)) - 1))]
+
+    return {'count': len(values), 'p50': round(rank(0.50) * 1000, 2), 'p95': round(rank(0.95) * 1000, 2),
+            'p99': round(rank(0.99) * 1000, 2), 'max': round(values[-1] * 1000, 2)}
+
+
+class LoadClient:
+    """One connection replaying a command pattern and timing the replies."""
+
+    def __init__(self, index, host, port, pattern, rate, burst=1, cam_id=1, malformed_every=0):
+        self.index = index
+        self.host = host
+        self.port = port
+        self.pattern = pattern
+        self.rate = rate
+        self.burst = burst
+        self.cam_id = cam_id
+        self.malformed_every = malformed_every
+        self._ids = itertools.count(1)
+        self._sequence = itertools.count()
+        self.sent = {}  # request id -> (send time, kind)
+        self.first_reply = {}  # request id -> time of MOVING/OK/ERR
+        self.completed = set()  # Moves with SETTLED, beeps with OK, anything with ERR
+        self.apply_latency = []
+        self.settle_latency = []
+        self.beep_latency = []
+        self.errors = 0
+        self.malformed_sent = 0
+        self.malformed_rejected = 0  # Malformed lines answered with ERR
+        self.commands_sent = 0
+        self.send_time = 0.0  # Seconds spent sending (without the wait for the last replies)
+
+    def _next_command(self):
+        n = next(self._sequence)
+        if self.malformed_every and n % self.malformed_every == self.malformed_every - 1:
+            self.malformed_sent += 1
+            request_id = next(self._ids)
+            self.sent[request_id] = (time.monotonic(), "malformed")
+            return f"{self.cam_id},not-an-angle,90,{request_id}"  # Answered with ERR
+        request_id = next(self._ids)
+        if self.pattern == "beep":
+            self.sent[request_id] = (time.monotonic(), "beep")
+            return f"BEEP,{self.cam_id},{BEEP_SECONDS},{request_id}"
+        if self.pattern == "step":
+            h_angle, v_angle = STEP_TARGETS[n % len(STEP_TARGETS)]
+        else:
+            low, high = JOG_RANGE
+            offset = n % (2 * (high - low))
+            h_angle, v_angle = low + min(offset, 2 * (high - low) - offset), 90
+        self.sent[request_id] = (time.monotonic(), "move")
+        return f"{self.cam_id},{h_angle},{v_angle},{request_id}"
+
+    def _on_reply(self, line, now):
+        kind, _, rest = line.partition(",")
+        request_id, _, _ = rest.partition(",")
+        if not request_id.isdigit() or int(request_id) not in self.sent:
+            return
+        request_id = int(request_id)
+        sent_at, command_kind = self.sent[request_id]
+        if request_id not in self.first_reply and kind in ("MOVING", "OK", "ERR"):
+            self.first_reply[request_id] = now
+            if kind == "MOVING":
+                self.apply_latency.append(now - sent_at)
+            elif kind == "OK":
+                self.beep_latency.append(now - sent_at)
+        if kind == "SETTLED":
+            self.settle_latency.append(now - sent_at)
+        if kind == "ERR" and command_kind == "malformed":
+            self.malformed_rejected += 1
+        elif kind == "ERR":
+            self.errors += 1
+        if kind in ("SETTLED", "ERR") or (kind == "OK" and command_kind == "beep"):
+            self.completed.add(request_id)
+
+    async def _read_replies(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            self._on_reply(line.decode().strip(), time.monotonic())
+
+    async def run(self, duration):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        reply_task = asyncio.create_task(self._read_replies(reader))
+        interval = self.burst / self.rate
+        next_send = start = time.monotonic()
+        while time.monotonic() - start < duration:
+            lines = [self._next_command() for _ in range(self.burst)]
+            writer.write("".join(f"{line}\n" for line in lines).encode())
+            await writer.drain()
+            self.commands_sent += len(lines)
+            next_send += interval
+            await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+        self.send_time = time.monotonic() - start
+
+        # Give outstanding replies time to arrive
+        deadline = time.monotonic() + REPLY_GRACE
+        while len(self.completed) < len(self.sent) and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        reply_task.cancel()
+        writer.close()
+
+    @property
+    def dropped(self):
+        """Requests that never got a first reply."""
+        return len(self.sent) - len(self.first_reply)
+
+
+def parse_stats(reply):
+    """"STATS,id,server:cpu=1 ... cam1:received=2 ..." -> {"server": {"cpu": 1.0, ...}, "cam1": {...}}."""
+    sections = {}
+    counters = None
+    for token in reply.split(",", 2)[2].split():
+        if ":" in token:
+            name, _, token = token.partition(":")
+            counters = sections.setdefault(name, {})
+        name, _, value = token.partition("=")
+        counters[name] = float(value) if "." in value else int(value)
+    return sections
+
+
+async def server_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b"STATS,1\n")
+    await writer.drain()
+    reply = (await asyncio.wait_for(reader.readline(), 5.0)).decode().strip()
+    writer.close()
+    return parse_stats(reply)
+
+
+def start_local_server():
+    """Run main.py with the simulated GPIO backend on a free localhost port."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-c", f"import asyncio, main; asyncio.run(main.serve('127.0.0.1', {port}))"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=dict(os.environ, GPIO_BACKEND="sim"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10.0
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Local simulated server did not start")
+
+
+def counter_delta(before, after, section, name):
+    return after.get(section, {}).get(name, 0) - before.get(section, {}).get(name, 0)
+
+
+async def run_load(host, port, clients, patterns, rate, burst, duration, malformed_every):
+    load_clients = [LoadClient(i, host, port, patterns[i % len(patterns)], rate, burst,
+                               cam_id=i % 2 + 1, malformed_every=malformed_every)
+                    for i in range(clients)]
+    before = await server_stats(host, port)
+    start = time.monotonic()
+    await asyncio.gather(*(client.run(duration) for client in load_clients))
+    elapsed = time.monotonic() - start
+    after = await server_stats(host, port)
+
+    commands_sent = sum(c.commands_sent for c in load_clients)
+    send_time = max(c.send_time for c in load_clients)
+    cpu_seconds = counter_delta(before, after, "server", "cpu")
+    cameras = sorted(name for name in after if name.startswith("cam"))
+    return {
+        'target': f"{host}:{port}",
+        'clients': clients,
+        'patterns': [c.pattern for c in load_clients],
+        'rate_per_client': rate,
+        'burst': burst,
+        'duration_s': round(send_time, 3),
+        'commands_sent': commands_sent,
+        'throughput_per_s': round(commands_sent / send_time, 1),
+        'latency_ms': {
+            'apply': percentiles([v for c in load_clients for v in c.apply_latency]),
+            'settle': percentiles([v for c in load_clients for v in c.settle_latency]),
+            'beep': percentiles([v for c in load_clients for v in c.beep_latency]),
+        },
+        'dropped': sum(c.dropped for c in load_clients),
+        'errors': sum(c.errors for c in load_clients),
+        'malformed_sent': sum(c.malformed_sent for c in load_clients),
+        'malformed_rejected': sum(c.malformed_rejected for c in load_clients),
+        'server': {
+            'commands': counter_delta(before, after, "server", "commands") - 1,  # Without the final STATS
+            'malformed': counter_delta(before, after, "server", "malformed"),
+            'cpu_seconds': round(cpu_seconds, 3),
+            'cpu_percent': round(100 * cpu_seconds / elapsed, 1),
+            **{camera: {name: counter_delta(before, after, camera, name)
+                        for name in ("received", "applied", "coalesced", "redundant", "pin_writes")}
+               for camera in cameras},
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the servo/LED command server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--local", action="store_true", help="Start a local server with simulated GPIO")
+    parser.add_argument("--clients", type=int, default=3)
+    parser.add_argument("--patterns", default="jog,step,beep", help=f"Comma-separated from {PATTERNS}")
+    parser.add_argument("--rate", type=float, default=20.0, help="Commands per second per client")
+    parser.add_argument("--burst", type=int, default=1, help="Commands per write")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of sending")
+    parser.add_argument("--malformed-every", type=int, default=0, help="Send a malformed line every N commands")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    patterns = args.patterns.split(",")
+    unknown = set(patterns) - set(PATTERNS)
+    if unknown:
+        parser.error(f"Unknown patterns: {', '.join(sorted(unknown))}")
+
+    process = None
+    host, port = args.host, args.port
+    if args.local:
+        process, port = start_local_server()
+        host = "127.0.0.1"
+    try:
+        report = asyncio.run(run_load(host, port, args.clients, patterns, args.rate, args.burst,
+                                      args.duration, args.malformed_every))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    if args.local:
+        report['target'] = "local simulated server"
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
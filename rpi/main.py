@@ -1,18 +1,34 @@
-import socket
-import pigpio
+import asyncio
+import itertools
+import os
 import time
-import threading
+from functools import partial
+
+from gpio_backend import OUTPUT, open_backend
+from gpio_scheduler import GpioScheduler, mask
+from motion import Trajectory
+from protocol import LEGACY_IDLE, CommandParser, format_reply, parse_command, rejected_request_id
 
 # Idle blinking variables
-last_blink_time = {}
+IDLE_BLINK_PERIOD = 0.5  # Seconds between LED toggles while no client is connected
 led_blink_state = {}
-active_beeps = {}  # Track active beep threads
 
-# Initialize pigpio
-pi = pigpio.pi()
-if not pi.connected:
-    print("Failed to connect to pigpio daemon.")
-    exit()
+# Buzzer timings
+INDICATE_BEEP = 0.05  # Seconds of the short beep after a move
+
+# Network Setup
+HOST = '0.0.0.0'
+PORT = 5000
+
+clients = set()  # Writers of the connected clients
+
+# GPIO backend: "pigpio" on the Pi, "sim" to run without hardware (see gpio_backend.py)
+GPIO_BACKEND = os.environ.get("GPIO_BACKEND", "pigpio")
+
+# Set by init_gpio()
+pi = None
+scheduler = None  # All timed work (LEDs, buzzers, servo updates, acknowledgements) goes through it
+clock = time.monotonic
 
 # GPIO Pin Setup for servos, LEDs, and buzzers
 servo_pins = {
@@ -33,126 +49,275 @@ buzzer_pins = {
 # Define PWM frequency and initial position (middle)
 PWM_FREQ = 50
 INITIAL_POSITION = 1650  # Default position for servos
+INITIAL_ANGLE = 90  # Angle matching INITIAL_POSITION
 
-# Initialize servos
-for cam_id, pins in servo_pins.items():
-    for pin in pins.values():
-        pi.set_mode(pin, pigpio.OUTPUT)
-        pi.set_servo_pulsewidth(pin, INITIAL_POSITION)
+# Settle estimate for acknowledged moves: trajectory duration plus a margin
+SETTLE_MARGIN = 0.1  # Seconds for the servo to catch up with the end of the trajectory
 
-# Initialize LEDs and buzzers
-for cam_id, leds in led_pins.items():
-    for pin in leds.values():
-        pi.set_mode(pin, pigpio.OUTPUT)
-        pi.write(pin, 0)  # Turn off LEDs initially
-    pi.set_mode(buzzer_pins[cam_id], pigpio.OUTPUT)
-    pi.write(buzzer_pins[cam_id], 0)  # Turn off buzzers initially
+current_angles = {}  # cam_id -> (horizontal, vertical) last commanded target
+positions = {}  # cam_id -> (horizontal, vertical) currently written along the trajectory
+trajectories = {}  # cam_id -> Trajectory still running
 
-    # Initialize idle state variables
-    last_blink_time[cam_id] = time.time()
-    led_blink_state[cam_id] = False
+# Move coalescing: moves that arrive faster than the servos are updated are
+# merged per camera and only the newest target is applied (latest wins)
+SERVO_UPDATE_PERIOD = 0.02  # Seconds; one 50 Hz PWM frame, also the trajectory update rate
+pending_moves = {}  # cam_id -> {"target": (h, v), "waiters": [(writer, request_id)]}
+settled_at = {}  # cam_id -> clock time when the last applied move settles
+ack_keys = itertools.count()  # Scheduler keys of pending SETTLED replies
+pulse_widths = {}  # pin -> pulse width last written
+move_stats = {}  # cam_id -> counters
+server_stats = dict(commands=0, malformed=0)  # Over all clients
 
 def set_angle(pin, angle):
-    """Convert angle to pulse width and set servo position."""
-    pulsewidth = 900 + (angle / 180) * 1500  # Convert angle to pulse width (900 to 2400 us)
+    """Convert angle to pulse width and set servo position; returns False if the pin already had it."""
+    pulsewidth = round(900 + (angle / 180) * 1500)  # Convert angle to pulse width (900 to 2400 us)
+    if pulse_widths.get(pin) == pulsewidth:
+        return False
     pi.set_servo_pulsewidth(pin, pulsewidth)
+    pulse_widths[pin] = pulsewidth
+    return True
+
+def send_reply(writer, kind, request_id, reason=None):
+    """Reply to a command that carried a request id (see protocol.py)."""
+    if request_id is None or writer.is_closing():
+        return
+    writer.write(format_reply(kind, request_id, reason))
 
 def indicate_action(cam_id):
-    """Indicate action with LEDs and buzzer."""
-    pi.write(led_pins[1]["red"], 0)  # Turn off red LED
-    pi.write(led_pins[2]["red"], 0)  # Turn off red LED
-    pi.write(led_pins[cam_id]["green"], 1)  # Turn on green LED
-    pi.write(buzzer_pins[cam_id], 1)  # Turn on buzzer
-    time.sleep(0.05)  # Beep for 50 ms
-    pi.write(buzzer_pins[cam_id], 0)  # Turn off buzzer
+    """Indicate action with LEDs and a short beep (switched off by the scheduler)."""
+    scheduler.write(set_mask=mask(led_pins[cam_id]["green"], buzzer_pins[cam_id]),  # Green LED and buzzer on
+                    clear_mask=mask(led_pins[1]["red"], led_pins[2]["red"]))  # Red LEDs off
+    scheduler.at(INDICATE_BEEP, ("buzzer", cam_id), clear_mask=mask(buzzer_pins[cam_id]), extend=True)
 
 def non_blocking_beep(cam_id, duration):
-    """Trigger a non-blocking long beep."""
-    if cam_id in active_beeps:
-        print(f"Camera {cam_id} is already beeping.")
-        return
+    """Long beep with the red LED; a beep that overlaps a running one extends it."""
+    # Schedule the buzzer off first, so a failure never leaves it on
+    scheduler.at(duration, ("buzzer", cam_id), clear_mask=mask(buzzer_pins[cam_id]), extend=True)
+    scheduler.write(set_mask=mask(buzzer_pins[cam_id], led_pins[cam_id]["red"]),
+                    clear_mask=mask(led_pins[cam_id]["green"]))
 
-    def beep_worker():
-        """Thread worker for non-blocking beep."""
-        pi.write(buzzer_pins[cam_id], 1)  # Turn on buzzer
-        pi.write(led_pins[cam_id]["green"], 0)
-        pi.write(led_pins[cam_id]["red"], 1)
-        time.sleep(duration)  # Beep for specified duration
-        pi.write(buzzer_pins[cam_id], 0)  # Turn off buzzer
-        del active_beeps[cam_id]  # Remove from active beeps when done
+def blink_idle_red():
+    """Blink the LEDs of all cameras while no client is connected; returns the pin changes."""
+    if clients:
+        return 0, 0
+    set_mask = clear_mask = 0
+    for cam_id, leds in led_pins.items():
+        led_blink_state[cam_id] = not led_blink_state[cam_id]
+        if led_blink_state[cam_id]:
+            set_mask |= mask(leds["red"], leds["green"])
+        else:
+            clear_mask |= mask(leds["red"], leds["green"])
+    return set_mask, clear_mask
 
-    active_beeps[cam_id] = threading.Thread(target=beep_worker)
-    active_beeps[cam_id].start()
+def format_stats():
+    """Server and per-camera move counters on one line, e.g. "server:cpu=0.52 ... cam1:received=3 ..."."""
+    sections = {"server": dict(server_stats, clients=len(clients), cpu=round(time.process_time(), 3))}
+    sections.update((f"cam{cam_id}", stats) for cam_id, stats in move_stats.items())
+    return " ".join(f"{section}:" + " ".join(f"{name}={value}" for name, value in counters.items())
+                    for section, counters in sections.items())
 
-def blink_idle_red():
-    """Blink red LEDs for all cameras in idle state."""
-    pi.write(led_pins[1]["green"], 0)
-    pi.write(led_pins[2]["green"], 0)
-    current_time = time.time()
-    for cam_id in led_pins.keys():
-        if current_time - last_blink_time[cam_id] > 0.5:  # Toggle every 0.5 seconds
-            last_blink_time[cam_id] = current_time
-            led_blink_state[cam_id] = not led_blink_state[cam_id]
-            pi.write(led_pins[cam_id]["red"], int(led_blink_state[cam_id]))
-            pi.write(led_pins[cam_id]["green"], int(led_blink_state[cam_id]))
+def queue_move(command, writer):
+    """Make this the camera's next target, replacing a target that was not applied yet."""
+    cam_id = command.cam_id
+    move_stats[cam_id]["received"] += 1
+    waiter = [(writer, command.request_id)] if command.request_id is not None else []
+    pending = pending_moves.get(cam_id)
+    if pending is None:
+        pending_moves[cam_id] = {"target": command.values, "waiters": waiter}
+    else:
+        move_stats[cam_id]["coalesced"] += 1
+        pending["target"] = command.values
+        pending["waiters"].extend(waiter)  # Acknowledged when the newest target settles
+    if not scheduler.pending(("servo", cam_id)):
+        update_camera(cam_id)  # Idle camera: apply at once
 
-# Network Setup
-host = '0.0.0.0'
-port = 5000
-server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server_socket.bind((host, port))
-server_socket.listen(1)
-print("Waiting for connections...")
-
-try:
-    while True:
-        # Idle state: Blink red LEDs while waiting for a connection
-        while True:
-            blink_idle_red()
-            server_socket.settimeout(0.1)  # Allow blinking during idle
-            try:
-                conn, addr = server_socket.accept()
-                break
-            except socket.timeout:
-                continue
+def apply_move(cam_id, target, waiters, now):
+    """
+    Plan a trajectory from where the camera is now to target, write its
+    first position and acknowledge the waiting requests. Returns True if a
+    new trajectory was started (and so already stepped for now).
+    """
+    stats = move_stats[cam_id]
+    horizontal_angle, vertical_angle = target
+    started = target != current_angles[cam_id]
+    if not started:
+        stats["redundant"] += 1  # Already there or on the way: no new trajectory and no beep
+    else:
+        # A move that replaces a running one starts where it is and as fast as it is going
+        running = trajectories.get(cam_id)
+        if running is None:
+            trajectory = Trajectory(positions[cam_id], target, now)
+        else:
+            trajectory = Trajectory(running.position(now), target, now, running.velocity(now))
+        trajectories[cam_id] = trajectory
+        step_trajectory(cam_id, now)  # Raises before the target is recorded if the pins can't be written
+        current_angles[cam_id] = target
+        settled_at[cam_id] = trajectory.end_time + SETTLE_MARGIN
+        stats["applied"] += 1
+        print(f"Camera {cam_id}: Horizontal Angle={horizontal_angle}, Vertical Angle={vertical_angle}, "
+              f"done in {trajectory.duration + SETTLE_MARGIN:.2f} s")
+        indicate_action(cam_id)  # Change LED and beep
+
+    # Report the estimated completion time, then acknowledge once the move should have settled
+    delay = max(0.0, settled_at.get(cam_id, now) - now)
+    for writer, request_id in waiters:
+        send_reply(writer, "MOVING", request_id, f"{delay:.3f}")
+        scheduler.call_at(delay, ("settled", next(ack_keys)), partial(send_reply, writer, "SETTLED", request_id))
+    return started
+
+def step_trajectory(cam_id, now):
+    """Write the camera's trajectory position for now; unchanged axes are skipped."""
+    trajectory = trajectories[cam_id]
+    position = trajectory.position(now)
+    for pin, angle in zip((servo_pins[cam_id]["horizontal"], servo_pins[cam_id]["vertical"]), position):
+        move_stats[cam_id]["pin_writes" if set_angle(pin, angle) else "pin_writes_skipped"] += 1
+    positions[cam_id] = position
+    if trajectory.done(now):
+        del trajectories[cam_id]
+
+def update_camera(cam_id):
+    """
+    Runs one camera: takes its newest target (moves arriving within one
+    SERVO_UPDATE_PERIOD are coalesced) and advances the running trajectory.
+    Repeats through the scheduler every period while there is work, so both
+    cameras move at once.
+    """
+    now = clock()
+    pending = pending_moves.pop(cam_id, None)
+    try:
+        started = pending is not None and apply_move(cam_id, pending["target"], pending["waiters"], now)
+        if not started and cam_id in trajectories:
+            step_trajectory(cam_id, now)
+    except Exception as e:
+        target = pending["target"] if pending else current_angles[cam_id]
+        print(f"Camera {cam_id}: error moving to {target}: {e}")
+        trajectories.pop(cam_id, None)
+        current_angles[cam_id] = positions[cam_id]  # Stopped where the last write left it
+        for writer, request_id in pending["waiters"] if pending else []:
+            send_reply(writer, "ERR", request_id, str(e))
+    if pending is not None or cam_id in trajectories:
+        scheduler.call_at(SERVO_UPDATE_PERIOD, ("servo", cam_id), partial(update_camera, cam_id))
 
-        print(f"Connected by {addr}")
+def dispatch(command, writer):
+    """Answer pings and stats directly, beep at once and coalesce moves per camera."""
+    cam_id = command.cam_id
+    if command.kind == "ping":
+        send_reply(writer, "PONG", command.request_id)
+    elif command.kind == "stats":
+        send_reply(writer, "STATS", command.request_id, format_stats())
+    elif cam_id not in servo_pins:
+        print(f"Invalid camera ID: {cam_id}")
+        send_reply(writer, "ERR", command.request_id, f"invalid camera {cam_id}")
+    elif command.kind == "beep":  # Long beep command
+        duration, = command.values
+        print(f"Camera {cam_id}: Non-Blocking Beep for {duration} seconds")
+        non_blocking_beep(cam_id, duration)
+        send_reply(writer, "OK", command.request_id)
+    else:  # Servo control
+        queue_move(command, writer)
 
-        try:
-            while True:
-                data = conn.recv(1024).decode()
+async def handle_client(reader, writer):
+    """Reads newline-delimited commands from one client (see protocol.py)."""
+    addr = writer.get_extra_info("peername")
+    print(f"Connected by {addr}")
+    clients.add(writer)
+    parser = CommandParser()
+    try:
+        while True:
+            try:
+                if parser.waiting_for_legacy:
+                    # A legacy client's unterminated command ends with a short pause
+                    data = await asyncio.wait_for(reader.read(4096), LEGACY_IDLE)
+                else:
+                    data = await reader.read(4096)
+            except asyncio.TimeoutError:
+                lines = parser.flush()
+            else:
                 if not data:
-                    print("Connection closed by client.")
+                    print(f"Connection closed by client {addr}.")
                     break
-                
-                # Parse received data
+                lines = parser.feed(data)
+
+            for line in lines:
                 try:
-                    parts = data.split(",")
-                    if parts[0] == "BEEP":  # Long beep command
-                        cam_id = int(parts[1])
-                        duration = float(parts[2])
-                        print(f"Camera {cam_id}: Non-Blocking Beep for {duration} seconds")
-                        non_blocking_beep(cam_id, duration)
-                    else:  # Servo control
-                        cam_id, horizontal_angle, vertical_angle = map(int, parts)
-                        print(f"Camera {cam_id}: Horizontal Angle={horizontal_angle}, Vertical Angle={vertical_angle}")
-                        
-                        # Set servo angles for the specified camera
-                        if cam_id in servo_pins:
-                            set_angle(servo_pins[cam_id]["horizontal"], horizontal_angle)
-                            set_angle(servo_pins[cam_id]["vertical"], vertical_angle)
-                            indicate_action(cam_id)  # Change LED and beep
-                        else:
-                            print(f"Invalid camera ID: {cam_id}")
-                except ValueError:
-                    print(f"Invalid data format: {data}")
-        except Exception as e:
-            print(f"Error: {e}")
-        finally:
-            conn.close()
-            print("Client disconnected.")
-finally:
-    # Cleanup and stop servos
+                    command = parse_command(line)
+                except ValueError as e:
+                    server_stats["malformed"] += 1
+                    print(f"Invalid data format: {line} ({e})")
+                    send_reply(writer, "ERR", rejected_request_id(line), str(e))
+                    continue
+                server_stats["commands"] += 1
+                try:
+                    dispatch(command, writer)
+                except Exception as e:  # One bad command must not drop the connection
+                    print(f"Error running {command}: {e}")
+                    send_reply(writer, "ERR", command.request_id, str(e))
+    except ConnectionError as e:
+        print(f"Error: {e}")
+    finally:
+        clients.discard(writer)
+        writer.close()
+        print(f"Client {addr} disconnected.")
+
+async def serve(host=HOST, port=PORT):
+    """Serve any number of clients; each camera applies its newest target in turn."""
+    task = asyncio.create_task(scheduler.run())
+    server = await asyncio.start_server(handle_client, host, port)
+    print("Waiting for connections...")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        task.cancel()
+        print(f"Move counters: {format_stats()}")
+
+def init_gpio(backend=GPIO_BACKEND, gpio_clock=time.monotonic):
+    """
+    Open the GPIO backend and put servos, LEDs and buzzers in their start
+    state. Everything timed reads gpio_clock, so with backend "sim" and a
+    VirtualClock the server runs without asyncio: call dispatch() and then
+    run_for() to move time on.
+    """
+    global pi, scheduler, clock
+    pi = open_backend(backend, gpio_clock)
+    if not pi.connected:
+        print("Failed to connect to pigpio daemon.")
+        exit()
+    clock = gpio_clock
+    for state in (current_angles, positions, trajectories, pending_moves, settled_at, pulse_widths, move_stats):
+        state.clear()
+
+    # Initialize servos
+    for cam_id, pins in servo_pins.items():
+        for pin in pins.values():
+            pi.set_mode(pin, OUTPUT)
+            pi.set_servo_pulsewidth(pin, INITIAL_POSITION)
+            pulse_widths[pin] = INITIAL_POSITION
+        move_stats[cam_id] = dict(received=0, applied=0, coalesced=0, redundant=0, pin_writes=0, pin_writes_skipped=0)
+
+    # Initialize LEDs and buzzers
+    for cam_id, leds in led_pins.items():
+        for pin in leds.values():
+            pi.set_mode(pin, OUTPUT)
+            pi.write(pin, 0)  # Turn off LEDs initially
+        pi.set_mode(buzzer_pins[cam_id], OUTPUT)
+        pi.write(buzzer_pins[cam_id], 0)  # Turn off buzzers initially
+
+        # Initialize idle state variables
+        led_blink_state[cam_id] = False
+        current_angles[cam_id] = positions[cam_id] = (INITIAL_ANGLE, INITIAL_ANGLE)
+
+    scheduler = GpioScheduler(pi, clock=gpio_clock)
+    scheduler.every(IDLE_BLINK_PERIOD, "idle_blink", blink_idle_red)
+
+def run_for(seconds):
+    """Advance a VirtualClock passed to init_gpio() by seconds, one scheduler tick at a time."""
+    end = clock() + seconds
+    while clock() < end:
+        scheduler.poll(clock.advance(scheduler.wheel.tick))
+
+def cleanup():
+    """Stop the servos and turn off LEDs and buzzers."""
     for cam_id, pins in servo_pins.items():
         for pin in pins.values():
             pi.set_servo_pulsewidth(pin, 0)  # Stop the servo
@@ -161,4 +326,13 @@ finally:
             pi.write(pin, 0)  # Turn off LEDs
         pi.write(buzzer_pins[cam_id], 0)  # Turn off buzzers
     pi.stop()
-    server_socket.close()
+
+init_gpio()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cleanup()
@@ -0,0 +1,118 @@
+"""
+Acceleration-limited servo trajectories.
+
+A camera's two axes move along a straight line in angle space with a
+trapezoidal speed profile (accelerate, cruise, decelerate) sized for the
+axis that travels furthest, so both finish together and large moves start
+and stop smoothly instead of jumping to the target pulse width. The server
+samples position(now) every PWM frame.
+
+A move that replaces a running one starts with the running move's
+velocity: the part of it along the new line is kept, so the servo speeds
+up, slows down or turns back within MAX_ACCEL instead of stopping dead.
+Only a sideways change of direction still changes speed at once.
+
+Run this file to check the acceleration limit across a replanned move.
+"""
+import math
+
+MAX_SPEED = 200.0  # Degrees per second of the leading axis
+MAX_ACCEL = 600.0  # Degrees per second squared
+
+
+def _phases(distance, speed, max_speed, max_accel):
+    """[(duration, accel)] that cover distance >= 0 along the line, from speed to rest."""
+    if speed < 0 or speed * speed / (2 * max_accel) > distance:
+        # Moving away from the target, or too fast to stop before it: brake, then come back
+        brake_time = abs(speed) / max_accel
+        remaining = distance - speed * brake_time / 2
+        direction = 1 if remaining >= 0 else -1
+        return [(brake_time, -math.copysign(max_accel, speed))] + [
+            (duration, direction * accel) for duration, accel in _phases(abs(remaining), 0.0, max_speed, max_accel)]
+    # Peak speed is lower than max_speed when the move is too short to reach it
+    peak_speed = min(max_speed, math.sqrt(distance * max_accel + speed * speed / 2))
+    if not peak_speed:
+        return []
+    change_time = abs(peak_speed - speed) / max_accel
+    stop_time = peak_speed / max_accel
+    change_distance = (speed + peak_speed) / 2 * change_time
+    cruise_time = max(0.0, distance - change_distance - peak_speed * stop_time / 2) / peak_speed
+    return [(change_time, math.copysign(max_accel, peak_speed - speed)), (cruise_time, 0.0),
+            (stop_time, -max_accel)]
+
+
+class Trajectory:
+    """
+    Planned move from start to target (h, v) angles beginning at start_time,
+    optionally starting with velocity (h, v) in degrees per second.
+    """
+
+    def __init__(self, start, target, start_time, velocity=(0.0, 0.0), max_speed=MAX_SPEED, max_accel=MAX_ACCEL):
+        self.start = start
+        self.target = target
+        self.start_time = start_time
+        self.distance = max(abs(t - s) for s, t in zip(start, target))
+        if self.distance:
+            self.direction = tuple((t - s) / self.distance for s, t in zip(start, target))
+        else:
+            # Already at the target: overshoot along the current velocity and come back
+            top = max(abs(v) for v in velocity)
+            self.direction = tuple(v / top for v in velocity) if top else (0.0, 0.0)
+        # Speed of the leading axis along the line (negative when moving away from the target)
+        norm = sum(d * d for d in self.direction)
+        speed = sum(v * d for v, d in zip(velocity, self.direction)) / norm if norm else 0.0
+
+        self.segments = []  # (start offset, travelled, speed, accel) per phase
+        offset = travelled = 0.0
+        for duration, accel in _phases(self.distance, speed, max_speed, max_accel):
+            self.segments.append((offset, travelled, speed, accel))
+            offset += duration
+            travelled += speed * duration + 0.5 * accel * duration ** 2
+            speed += accel * duration
+        self.duration = offset
+        self.end_time = start_time + self.duration
+
+    def _state(self, t):
+        """(travelled, speed) of the leading axis along the line t seconds into the move."""
+        if t >= self.duration:
+            return self.distance, 0.0
+        t = max(t, 0.0)
+        for offset, travelled, speed, accel in reversed(self.segments):
+            if t >= offset:
+                dt = t - offset
+                return travelled + speed * dt + 0.5 * accel * dt ** 2, speed + accel * dt
+        return 0.0, 0.0
+
+    def position(self, now):
+        """(h, v) angles at time now."""
+        if now >= self.end_time:
+            return self.target
+        travelled, _ = self._state(now - self.start_time)
+        return tuple(s + d * travelled for s, d in zip(self.start, self.direction))
+
+    def velocity(self, now):
+        """(h, v) degrees per second at time now."""
+        _, speed = self._state(now - self.start_time)
+        return tuple(d * speed for d in self.direction)
+
+    def done(self, now):
+        return now >= self.end_time
+
+
+if __name__ == "__main__":
+    # A 60 degree move replaced mid-way by one back past its start, sampled every millisecond
+    step = 0.001
+    first = Trajectory((90, 90), (150, 90), 0.0)
+    replan_time = 0.15
+    second = Trajectory(first.position(replan_time), (80, 90), replan_time, first.velocity(replan_time))
+    samples = [first.position(i * step)[0] for i in range(round(replan_time / step))]
+    samples += [second.position(replan_time + i * step)[0]
+                for i in range(round((second.end_time - replan_time) / step) + 2)]
+    speeds = [(b - a) / step for a, b in zip(samples, samples[1:])]
+    peak_accel = max(abs(b - a) / step for a, b in zip(speeds, speeds[1:]))
+    print(f"Replanned at {first.position(replan_time)[0]:.1f} deg moving {first.velocity(replan_time)[0]:.0f} deg/s, "
+          f"back at {second.target[0]} deg after {second.end_time:.3f} s; "
+          f"peak speed {max(map(abs, speeds)):.0f} deg/s, peak accel {peak_accel:.0f} deg/s^2")
+    assert max(map(abs, speeds)) <= MAX_SPEED * 1.01
+    assert peak_accel <= MAX_ACCEL * 1.05, "velocity jumped at the replan"
+    assert abs(samples[-1] - 80) < 1e-9
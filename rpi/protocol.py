@@ -0,0 +1,111 @@
+"""
+Command protocol between the PC and the servo server.
+
+Every command is one line of text ended by "\\n" ("\\r\\n" is accepted too),
+so any number of commands can be sent in one write:
+
+    cam,h_angle,v_angle[,id]    move the camera's servos
+    BEEP,cam,seconds[,id]       long beep with the red LED
+    PING[,id]                   round-trip check
+    STATS[,id]                  servo command counters
+
+When a command carries a numeric id the server replies with a line of its
+own: "MOVING,id,seconds" with a move's estimated time to settle, then
+"SETTLED,id" once it should have settled, "OK,id" for a beep,
+"PONG,id" for a ping, "STATS,id,<counters>" for STATS and "ERR,id,reason"
+when the command was rejected. A line that cannot be parsed is answered
+with "ERR,id,reason" if its id can still be read, otherwise "ERR,,reason".
+
+Older clients send a single command per write without a newline. Until a
+connection has sent its first newline, data that is followed by a short
+pause (LEGACY_IDLE) is taken as one such command.
+"""
+import math
+from collections import namedtuple
+
+MAX_LINE = 1024  # Longest accepted command line in bytes
+MAX_BEEP = 60.0  # Longest accepted BEEP in seconds
+MAX_ANGLE = 180  # Servo angles are 0..MAX_ANGLE degrees
+LEGACY_IDLE = 0.05  # Seconds of silence that end an unterminated legacy command
+
+# kind is "move", "beep", "ping" or "stats"; values are (h_angle, v_angle) or (seconds,)
+Command = namedtuple("Command", ["kind", "cam_id", "values", "request_id"])
+
+
+def _request_id(extra):
+    if not extra:
+        return None
+    if len(extra) > 1:
+        raise ValueError("too many fields")
+    return int(extra[0])
+
+
+def parse_command(line):
+    """Parse one command line; raises ValueError if it is malformed."""
+    parts = [part.strip() for part in line.strip().split(",")]
+    if parts[0] == "BEEP":
+        if len(parts) < 3:
+            raise ValueError("BEEP needs a camera and a duration")
+        duration = float(parts[2])
+        if not math.isfinite(duration) or not 0 <= duration <= MAX_BEEP:
+            raise ValueError(f"beep duration must be between 0 and {MAX_BEEP} seconds")
+        return Command("beep", int(parts[1]), (duration,), _request_id(parts[3:]))
+    if parts[0] in ("PING", "STATS"):
+        return Command(parts[0].lower(), None, (), _request_id(parts[1:]))
+    if len(parts) < 3:
+        raise ValueError("a move needs a camera and two angles")
+    cam_id, h_angle, v_angle = map(int, parts[:3])
+    if not (0 <= h_angle <= MAX_ANGLE and 0 <= v_angle <= MAX_ANGLE):
+        raise ValueError(f"angles must be between 0 and {MAX_ANGLE} degrees")
+    return Command("move", cam_id, (h_angle, v_angle), _request_id(parts[3:]))
+
+
+def rejected_request_id(line):
+    """Request id of a line parse_command rejected, if its id field can still be read; otherwise ""."""
+    parts = [part.strip() for part in line.strip().split(",")]
+    id_field = 1 if parts[0] in ("PING", "STATS") else 3
+    if len(parts) == id_field + 1 and parts[id_field].isdigit():
+        return int(parts[id_field])
+    return ""
+
+
+def format_reply(kind, request_id, reason=None):
+    """Encode a reply line, e.g. format_reply("SETTLED", 7) -> b"SETTLED,7\\n"."""
+    fields = [kind, str(request_id)] + ([reason.replace(",", ";").replace("\n", " ")] if reason else [])
+    return (",".join(fields) + "\n").encode("utf-8")
+
+
+class CommandParser:
+    """
+    Splits a TCP byte stream into command lines, whatever way the sends were
+    merged or split by the network. feed() returns the complete lines;
+    partial ones stay buffered until the rest arrives.
+    """
+
+    def __init__(self, max_line=MAX_LINE):
+        self.max_line = max_line
+        self.framed = False  # The client has sent a newline, so it uses this protocol
+        self._buffer = b""
+
+    @property
+    def waiting_for_legacy(self):
+        """True when unterminated data from a legacy client is buffered."""
+        return not self.framed and bool(self._buffer.strip())
+
+    def feed(self, data):
+        self._buffer += data
+        if b"\n" not in self._buffer:
+            if len(self._buffer) > self.max_line:
+                print(f"Dropping {len(self._buffer)} bytes without a newline")
+                self._buffer = b""
+            return []
+        self.framed = True
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return [line.decode("utf-8", "replace").strip() for line in lines if line.strip()]
+
+    def flush(self):
+        """Take buffered unterminated data as one legacy command (after LEGACY_IDLE of silence)."""
+        if not self.waiting_for_legacy:
+            return []
+        line, self._buffer = self._buffer.decode("utf-8", "replace").strip(), b""
+        return [line]
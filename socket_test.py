@@ -1,5 +1,66 @@
 import socket
-client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-client_socket.connect(('192.168.137.152', 5000))  # Replace with actual RPi IP
-print("Connected to server")
-client_socket.close()
+import sys
+import threading
+import time
+
+# Usage: python socket_test.py [HOST] [PORT] [CLIENTS]
+# Connects several clients at once and checks that each one gets its replies
+# (PONG for a ping; MOVING and then SETTLED for a move) while the others stay
+# connected.
+HOST = sys.argv[1] if len(sys.argv) > 1 else '192.168.137.152'  # Replace with actual RPi IP
+PORT = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+CLIENTS = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+TIMEOUT = 2.0
+
+
+def read_until(client_socket, buffer, expected):
+    """Read reply lines until one equal to expected; other replies (e.g. MOVING) are skipped."""
+    deadline = time.monotonic() + TIMEOUT
+    while True:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"no {expected} within {TIMEOUT} s")
+        line, buffer = read_reply(client_socket, buffer)
+        if line == expected:
+            return line, buffer
+        if line.startswith("ERR,"):
+            raise ConnectionError(f"server rejected the request: {line}")
+
+
+def read_reply(client_socket, buffer):
+    while b"\n" not in buffer:
+        data = client_socket.recv(1024)
+        if not data:
+            raise ConnectionError("connection closed")
+        buffer += data
+    line, _, buffer = buffer.partition(b"\n")
+    return line.decode(), buffer
+
+
+def run_client(index, barrier, results):
+    try:
+        client_socket = socket.create_connection((HOST, PORT), timeout=TIMEOUT)
+        barrier.wait()  # All clients are connected before any command is sent
+        start = time.monotonic()
+        client_socket.sendall(f"PING,{index}\n".encode())
+        pong, buffer = read_until(client_socket, b"", f"PONG,{index}")
+        ping_time = time.monotonic() - start
+        client_socket.sendall(f"1,{60 + 10 * index},90,{100 + index}\n".encode())  # A real move, not the rest position
+        settled, buffer = read_until(client_socket, buffer, f"SETTLED,{100 + index}")
+        results[index] = f"{pong} in {ping_time * 1000:.1f} ms, {settled} in {(time.monotonic() - start) * 1000:.1f} ms"
+        client_socket.close()
+    except (OSError, threading.BrokenBarrierError) as e:
+        results[index] = f"FAILED: {e}"
+
+
+barrier = threading.Barrier(CLIENTS, timeout=TIMEOUT)
+results = {}
+threads = [threading.Thread(target=run_client, args=(i, barrier, results)) for i in range(CLIENTS)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+for index in sorted(results):
+    print(f"Client {index}: {results[index]}")
+if any(result.startswith("FAILED") for result in results.values()):
+    sys.exit(1)
+print(f"All {CLIENTS} clients served concurrently")